@@ -1,26 +1,40 @@
+import io
 import os
 import sys
+import argparse
 import signal
 import time
 import threading
 import webbrowser
-from flask import Flask, request, jsonify, render_template, url_for, send_from_directory
+from contextlib import nullcontext
+from flask import Flask, Response, g, request, jsonify, render_template, url_for, send_file, send_from_directory, stream_with_context
 from backend.utils.security import decrypt_password
+from backend.utils.export import stream_csv, stream_xlsx
+from backend.utils.assets import AssetManifest
+from backend.utils.metrics import observe_request, render_prometheus
+from backend.utils.query_profiler import enable_query_profiler
 
-def open_browser():
-    webbrowser.open("http://127.0.0.1:5000")
-
-# --- UTILS ---
-from backend.utils.security import is_subscription_active, decrypt_date
+def open_browser(port=5000):
+    webbrowser.open(f"http://127.0.0.1:{port}")
 
 # ---DATABASE IMPORT---
-from backend.database import employee_db, get_connection
+from backend.database import (
+    employee_db,
+    get_connection,
+    begin_request_scope,
+    end_request_scope,
+    close_all_connections,
+    reset_statement_stats,
+    get_statement_stats
+)
 
 # ---DOCUMENT IMPORTS---
 from backend.services.documents import (
     get_documents_by_employee, 
-    add_document, 
+    store_document, 
     get_document_by_id, 
+    get_document_file,
+    get_blob_file,
     delete_document_record
 )
 
@@ -38,16 +52,57 @@ from backend.services.employee import (
 from backend.services.attendance import (
     check_in,
     check_out,
-    get_attendance_by_employee
+    bulk_check_in,
+    bulk_check_out,
+    get_attendance_by_employee,
+    get_attendance_monthly_summary,
+    get_attendance_board,
+    rebuild_monthly_rollup
 )
 
+# ---ATTENDANCE IMPORT (PUNCH CLOCK)---
+from backend.services.attendance_import import import_attendance
+
 # ---SALARY IMPORT---
 from backend.services.salary import (
     generate_salary,
+    generate_all_salaries,
     get_salary,
     update_salary_details
 )
 
+# ---REPORT IMPORT---
+from backend.services.reports import (
+    resolve_register_range,
+    iter_attendance_register,
+    iter_salary_register,
+    get_dashboard_summary
+)
+
+# ---BACKUP IMPORT---
+from backend.services.backup import start_backup_job, get_backup_job
+
+# ---SERVER IMPORT---
+from backend.server import (
+    serve,
+    drain_server,
+    DEFAULT_THREADS,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_BACKLOG,
+    DEFAULT_KEEPALIVE_SECONDS
+)
+
+# ---WRITE-BEHIND CHECK-IN IMPORT---
+from backend.services.attendance_queue import (
+    queued_check_in,
+    queued_check_out,
+    flush_attendance_queue,
+    synchronous_write
+)
+
+# ---AUDIT IMPORT---
+from backend.services.audit import set_audit_actor, flush_audit_log
+
 # ---SETTINGS IMPORT---
 from backend.services.settings import (
     get_working_hours,
@@ -57,8 +112,8 @@ from backend.services.settings import (
     update_user_password,
     delete_system_user,
     update_subscription_expiry,
-    get_subscription_expiry_encrypted,
-    create_database_backup,
+    get_subscription_status,
+    get_subscription_expiry_date,
     get_demo_mode_status, # NEW
     update_demo_mode      # NEW
 )
@@ -82,21 +137,69 @@ else:
     BASE_DIR = project_root
     app = Flask(__name__, template_folder=template_folder, static_folder=static_folder)
 
+# Set by the headless LAN server so front-desk terminals cannot stop it
+app.config["LOCAL_SHUTDOWN_ONLY"] = False
+# Acknowledge plain check-ins/outs before they are committed (see attendance_queue.py)
+app.config["WRITE_BEHIND_CHECKINS"] = False
+
+# Hashed, precompressed copies of static/ for the templates (see utils/assets.py)
+assets = AssetManifest(app.static_folder, bundle=os.environ.get("ATTENDANCE_BUNDLE_ASSETS") == "1")
+app.jinja_env.globals.update(asset_url=assets.url, asset_urls=assets.urls)
+
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'UPLOADS')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Initialize DB (and fix passwords)
+# Apply any pending schema migrations (a no-op on an up-to-date database)
 employee_db()
 
+# -------------------------
+# REQUEST LIFECYCLE
+# -------------------------
+@app.before_request
+def start_request_timer():
+    # Registered first so the timings cover the other hooks as well
+    g.request_started = time.perf_counter()
+    reset_statement_stats()
+
+@app.before_request
+def open_db_scope():
+    # One pooled connection serves every query made while handling the request
+    begin_request_scope()
+    # Audit entries written while handling the request are attributed to this user
+    set_audit_actor(request.headers.get("X-User-Id"))
+    # Reads of attendance must include check-ins still waiting in the write-behind queue
+    if app.config["WRITE_BEHIND_CHECKINS"] and request.endpoint in ATTENDANCE_READ_ENDPOINTS:
+        flush_attendance_queue()
+
+@app.after_request
+def record_request_metrics(response):
+    # Routes are labelled by their rule (/employees/<int:employee_id>), not the raw path
+    method = request.method
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    started = g.request_started
+
+    # Streamed responses (the exports) run their queries while the body is
+    # sent, so observe once the server closes the response. The body is
+    # produced on this thread, so the statement stats still belong to it.
+    def observe():
+        sql_count, sql_seconds = get_statement_stats()
+        observe_request(method, route, response.status_code,
+                        time.perf_counter() - started, sql_count, sql_seconds)
+
+    response.call_on_close(observe)
+    return response
+
+@app.teardown_request
+def close_db_scope(exc):
+    set_audit_actor(None)
+    end_request_scope()
+
 # -------------------------
 # VIEW ROUTES
 # -------------------------
 @app.route("/")
 def home():
-    encrypted_expiry = get_subscription_expiry_encrypted()
-    expiry_date = None
-    if encrypted_expiry:
-        expiry_date = decrypt_date(encrypted_expiry)
+    expiry_date = get_subscription_expiry_date()
     
     # Pass demo mode status to template
     demo_mode = get_demo_mode_status()
@@ -141,8 +244,7 @@ def login_route():
         return jsonify({"error": "Invalid credentials"}), 401
 
     if role != 'head':
-        encrypted_expiry = get_subscription_expiry_encrypted()
-        is_active, expiry_str = is_subscription_active(encrypted_expiry)
+        is_active, expiry_str = get_subscription_status()
         
         if not is_active:
             return jsonify({
@@ -169,18 +271,19 @@ def add_employee_route():
 
 @app.route("/employees", methods=["GET"])
 def get_employees_route():
-    employees = get_all_employees()
-    result = []
-    for emp in employees:
-            result.append({
-        "id": emp[0],
-        "name": emp[1],
-        "role": emp[2],
-        "phone": emp[3],
-        "address": emp[4],
-        "monthly_salary": emp[5],
-        "status": emp[6]
-    })
+    fields = request.args.get("fields")
+    try:
+        result = get_all_employees(
+            status=request.args.get("status"),
+            role=request.args.get("role"),
+            sort=request.args.get("sort", "id"),
+            order=request.args.get("order", "asc"),
+            limit=request.args.get("limit", type=int),
+            cursor=request.args.get("cursor"),
+            fields=fields.split(",") if fields else None
+        )
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
     return jsonify(result)
 
 @app.route("/employee/update_salary", methods=["POST"])
@@ -214,7 +317,8 @@ def activate_employee_route():
 def delete_employee_route():
     data = request.json
     try:
-        delete_employee(data.get("employee_id"))
+        with _attendance_write():
+            delete_employee(data.get("employee_id"))
         return jsonify({"message": "Employee permanently deleted"})
     except Exception as e:
         return jsonify({"message": str(e)}), 400
@@ -237,6 +341,20 @@ def get_employee_profile(employee_id):
 # -------------------------
 # ATTENDANCE ROUTES
 # -------------------------
+ATTENDANCE_READ_ENDPOINTS = {
+    "attendance_view_route",
+    "attendance_board_route",
+    "dashboard_summary_route",
+    "generate_salary_route",
+    "generate_all_salaries_route",
+    "export_attendance_route",
+    "export_salary_route",
+}
+
+def _attendance_write():
+    """Context for attendance writes that bypass the write-behind queue."""
+    return synchronous_write() if app.config["WRITE_BEHIND_CHECKINS"] else nullcontext()
+
 @app.route("/attendance/checkin", methods=["POST"])
 def checkin_route():
     data = request.json
@@ -248,7 +366,11 @@ def checkin_route():
         return jsonify({"message": "Unauthorized: Only Admin/Head can set manual time or date"}), 403
 
     try:
-        check_in(data.get("employee_id"), custom_time=manual_time, target_date=manual_date)
+        if app.config["WRITE_BEHIND_CHECKINS"] and not (manual_time or manual_date):
+            queued_check_in(data.get("employee_id"))
+        else:
+            with _attendance_write():
+                check_in(data.get("employee_id"), custom_time=manual_time, target_date=manual_date)
         return jsonify({"message": "Check-in successful"})
     except Exception as e:
         return jsonify({"message": str(e)}), 400
@@ -264,22 +386,96 @@ def checkout_route():
         return jsonify({"message": "Unauthorized: Only Admin/Head can set manual time or date"}), 403
 
     try:
-        check_out(data.get("employee_id"), custom_time=manual_time, target_date=manual_date)
+        if app.config["WRITE_BEHIND_CHECKINS"] and not (manual_time or manual_date):
+            queued_check_out(data.get("employee_id"))
+        else:
+            with _attendance_write():
+                check_out(data.get("employee_id"), custom_time=manual_time, target_date=manual_date)
         return jsonify({"message": "Check-out successful"})
     except Exception as e:
         return jsonify({"message": str(e)}), 400
 
+def _bulk_attendance_response(action, verb):
+    data = request.json
+    manual_time = data.get("manual_time")
+    manual_date = data.get("manual_date")
+    role = data.get("role")
+
+    if (manual_time or manual_date) and role not in ['head', 'admin']:
+        return jsonify({"message": "Unauthorized: Only Admin/Head can set manual time or date"}), 403
+
+    try:
+        with _attendance_write():
+            results = action(data.get("employee_ids"), custom_time=manual_time, target_date=manual_date)
+    except Exception as e:
+        return jsonify({"message": str(e)}), 400
+
+    success = sum(1 for r in results if r["ok"])
+    return jsonify({
+        "message": f"{verb} {success} of {len(results)} employees",
+        "success": success,
+        "failed": len(results) - success,
+        "results": results
+    })
+
+@app.route("/attendance/bulk_checkin", methods=["POST"])
+def bulk_checkin_route():
+    return _bulk_attendance_response(bulk_check_in, "Checked in")
+
+@app.route("/attendance/bulk_checkout", methods=["POST"])
+def bulk_checkout_route():
+    return _bulk_attendance_response(bulk_check_out, "Checked out")
+
+@app.route("/attendance/import", methods=["POST"])
+def import_attendance_route():
+    if request.form.get("role") not in ['head', 'admin']:
+        return jsonify({"message": "Unauthorized: Only Admin/Head can import attendance"}), 403
+    if "file" not in request.files:
+        return jsonify({"error": "No file uploaded"}), 400
+
+    dry_run = request.form.get("dry_run") in ("1", "true")
+    # Read the upload as a text stream so large files are never loaded whole
+    lines = io.TextIOWrapper(request.files["file"].stream, encoding="utf-8-sig", newline="")
+    try:
+        with nullcontext() if dry_run else _attendance_write():
+            report = import_attendance(lines, dry_run=dry_run)
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify(report)
+
+@app.route("/attendance/rollup/rebuild", methods=["POST"])
+def rebuild_rollup_route():
+    data = request.get_json(silent=True) or {}
+    if data.get("role") not in ['head', 'admin']:
+        return jsonify({"message": "Unauthorized: Only Admin/Head can rebuild totals"}), 403
+    with _attendance_write():
+        rows = rebuild_monthly_rollup()
+    return jsonify({"message": f"Rebuilt {rows} monthly attendance rows"})
+
+@app.route("/attendance/board", methods=["GET"])
+def attendance_board_route():
+    try:
+        return jsonify(get_attendance_board(request.args.get("date")))
+    except ValueError:
+        return jsonify({"message": "Date must be YYYY-MM-DD"}), 400
+
 @app.route("/attendance/<int:employee_id>", methods=["GET"])
 def attendance_view_route(employee_id):
-    records = get_attendance_by_employee(employee_id)
-    result = []
-    for r in records:
-        result.append({
-            "date": r[0],
-            "check_in": r[1],
-            "check_out": r[2],
-            "worked_hours": r[3]
-        })
+    date_from = request.args.get("from")
+    date_to = request.args.get("to")
+    try:
+        result = get_attendance_by_employee(
+            employee_id,
+            date_from=date_from,
+            date_to=date_to,
+            limit=request.args.get("limit", type=int),
+            cursor=request.args.get("cursor")
+        )
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    if request.args.get("summary") in ("1", "true"):
+        result["summary"] = get_attendance_monthly_summary(employee_id, date_from, date_to)
     return jsonify(result)
 
 # -------------------------
@@ -296,6 +492,15 @@ def generate_salary_route():
             return jsonify({"message": "Salary already generated", "status": "exists"}), 200
         return jsonify({"message": str(e), "status": "error"}), 400
 
+@app.route("/salary/generate_all", methods=["POST"])
+def generate_all_salaries_route():
+    data = request.json
+    try:
+        summary = generate_all_salaries(data.get("month"), data.get("role"))
+        return jsonify({"message": "Payroll generated", **summary})
+    except Exception as e:
+        return jsonify({"message": str(e), "status": "error"}), 400
+
 @app.route("/salary/view", methods=["GET"])
 def get_salary_route():
     employee_id = request.args.get("employee_id", type=int)
@@ -327,26 +532,89 @@ def update_generated_salary_route():
     except Exception as e:
         return jsonify({"message": str(e)}), 400
 
+# -------------------------
+# DASHBOARD ROUTES
+# -------------------------
+@app.route("/dashboard/summary", methods=["GET"])
+def dashboard_summary_route():
+    try:
+        return jsonify(get_dashboard_summary())
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+# -------------------------
+# METRICS ROUTE
+# -------------------------
+@app.route("/metrics")
+def metrics_route():
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+# -------------------------
+# EXPORT ROUTES
+# -------------------------
+EXPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv; charset=utf-8"),
+    "xlsx": (stream_xlsx, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+def _export_response(rows, filename, fmt):
+    writer, mimetype = EXPORT_FORMATS[fmt]
+    if fmt == "xlsx":
+        chunks = writer(rows, sheet_name=filename)
+    else:
+        chunks = writer(rows)
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
+
+@app.route("/export/attendance", methods=["GET"])
+def export_attendance_route():
+    fmt = request.args.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"message": "Format must be csv or xlsx"}), 400
+    try:
+        date_from, date_to = resolve_register_range(
+            request.args.get("month"), request.args.get("from"), request.args.get("to")
+        )
+        rows = iter_attendance_register(date_from, date_to)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return _export_response(rows, f"attendance_{date_from}_to_{date_to}", fmt)
+
+@app.route("/export/salary", methods=["GET"])
+def export_salary_route():
+    fmt = request.args.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"message": "Format must be csv or xlsx"}), 400
+    month = request.args.get("month")
+    month_from = request.args.get("from", month)
+    month_to = request.args.get("to", month)
+    if not month_from or not month_to:
+        return jsonify({"message": "Provide a month or both from and to months"}), 400
+    rows = iter_salary_register(month_from, month_to)
+    return _export_response(rows, f"salary_{month_from}_to_{month_to}", fmt)
+
 # -------------------------
 # DOCUMENT ROUTES
 # -------------------------
 @app.route("/employee/<int:employee_id>/documents", methods=["GET"])
 def get_employee_documents_route(employee_id):
+    # Everything comes from the stored record; the filesystem is not touched
     docs = get_documents_by_employee(employee_id)
     result = []
     for d in docs:
-        doc_id = d[0]
-        file_path_db = d[3]
-        # Resolve path relative to the persistent UPLOAD folder
-        abs_path = os.path.join(BASE_DIR, file_path_db)
-        if not os.path.exists(abs_path):
-            pass 
         result.append({
             "doc_id": d[0],
             "doc_type": d[1],
             "adhaar_no": d[2],
             "file_path": d[3],
-            "uploaded_at": d[4]
+            "uploaded_at": d[4],
+            "original_name": d[5],
+            "size_bytes": d[6],
+            "mime_type": d[7],
+            "url": url_for("document_file_route", doc_id=d[0])
         })
     return jsonify(result)
 
@@ -359,18 +627,17 @@ def upload_employee_document(employee_id):
     adhaar_no = request.form.get("adhaar_no")
     if file.filename == "":
         return jsonify({"error": "Empty file"}), 400
+    if not get_employee_by_id(employee_id):
+        return jsonify({"error": "Employee not found"}), 404
     
-    # Save physical file
-    emp_folder_name = f"employee_{employee_id}"
-    emp_folder = os.path.join(UPLOAD_FOLDER, emp_folder_name)
-    os.makedirs(emp_folder, exist_ok=True)
-    
-    file_path = os.path.join(emp_folder, file.filename)
-    file.save(file_path)
-    
-    # Save DB record (Relative path for portability)
-    db_path = os.path.join("UPLOADS", emp_folder_name, file.filename)
-    add_document(employee_id, doc_type, adhaar_no, db_path)
+    # Stream into the shared content-addressed store (deduplicated)
+    try:
+        store_document(
+            employee_id, doc_type, adhaar_no,
+            file.stream, os.path.basename(file.filename), file.mimetype
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify({"message": "Document uploaded successfully"})
 
 @app.route("/documents/delete", methods=["POST"])
@@ -380,20 +647,85 @@ def delete_document_route_api():
     doc = get_document_by_id(doc_id)
     if not doc:
         return jsonify({"message": "Document not found"}), 404
-    file_path_db = doc[0]
     delete_document_record(doc_id)
-    try:
-        abs_path = os.path.join(BASE_DIR, file_path_db)
-        if os.path.exists(abs_path):
-            os.remove(abs_path)
-    except Exception as e:
-        print(f"Error deleting file: {e}")
     return jsonify({"message": "Document deleted successfully"})
 
+# Blobs never change once written, so browsers may keep them for a year
+IMMUTABLE_MAX_AGE = 31536000
+
+def _send_document(info):
+    """
+    Sends a stored document with validators taken from its record:
+    a strong ETag (content hash, or size+mtime for legacy files),
+    Last-Modified, 304 on conditional requests and 206 for Range requests.
+    """
+    if not os.path.exists(info["abs_path"]):
+        return jsonify({"message": "Document file missing"}), 404
+
+    if info["content_hash"]:
+        etag = info["content_hash"]
+    else:
+        etag = f'{info["size_bytes"] or 0:x}-{int(info["mtime"] or 0):x}'
+
+    response = send_file(
+        info["abs_path"],
+        mimetype=info["mime_type"],
+        download_name=info["original_name"],
+        conditional=True,
+        etag=etag,
+        last_modified=info["mtime"],
+        max_age=IMMUTABLE_MAX_AGE if info["content_hash"] else 0
+    )
+    # Employee documents are personal data: browser cache only, never shared caches
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if info["content_hash"]:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+@app.route("/documents/<int:doc_id>/file", methods=["GET"])
+def document_file_route(doc_id):
+    info = get_document_file(doc_id)
+    if not info:
+        return jsonify({"message": "Document not found"}), 404
+    return _send_document(info)
+
 @app.route('/UPLOADS/<path:filename>')
 def uploaded_file(filename):
+    if filename.startswith("blobs/"):
+        info = get_blob_file(os.path.basename(filename))
+        if info:
+            return _send_document(info)
     return send_from_directory(UPLOAD_FOLDER, filename)
 
+# -------------------------
+# STATIC ASSET ROUTE
+# -------------------------
+@app.route("/assets/<digest>/<path:filename>", methods=["GET"])
+def asset_route(digest, filename):
+    asset = assets.get(filename)
+    if asset is None:
+        return jsonify({"message": "Asset not found"}), 404
+
+    encoding, body = asset.negotiate(request.headers.get("Accept-Encoding"))
+    response = Response(body, mimetype=asset.mimetype)
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.content_encoding = encoding
+    response.set_etag(f"{asset.digest}-{encoding}" if encoding else asset.digest)
+
+    if digest == asset.digest:
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # A page rendered before the file changed; serve the current
+        # content without letting it be cached under the old URL
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 # -------------------------
 # SETTINGS & RENEWAL ROUTES
 # -------------------------
@@ -408,19 +740,33 @@ def get_hours_route():
 @app.route("/settings/hours", methods=["POST"])
 def update_hours_route():
     try:
-        update_working_hours(request.json.get("hours"))
+        data = request.json
+        update_working_hours(data.get("hours"), snapshot_rates=bool(data.get("snapshot")))
         return jsonify({"message": "Working hours updated"})
     except Exception as e:
         return jsonify({"message": str(e)}), 400
 
 @app.route("/settings/backup", methods=["POST"])
 def backup_db_route():
+    data = request.get_json(silent=True) or {}
     try:
-        filename = create_database_backup()
-        return jsonify({"message": f"Backup created successfully: {filename}"})
+        job = start_backup_job(
+            compress=bool(data.get("compress")),
+            mode=data.get("mode", "full")
+        )
+        return jsonify({"message": "Backup started", **job}), 202
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
+@app.route("/settings/backup/<job_id>", methods=["GET"])
+def backup_status_route(job_id):
+    job = get_backup_job(job_id)
+    if not job:
+        return jsonify({"message": "Backup job not found"}), 404
+    return jsonify(job)
+
 @app.route("/users/add", methods=["POST"])
 def add_user_route():
     data = request.json
@@ -459,10 +805,7 @@ def delete_user_route():
 
 @app.route("/settings/renewal", methods=["GET"])
 def get_renewal_route():
-    enc = get_subscription_expiry_encrypted()
-    if enc:
-        return jsonify({"date": decrypt_date(enc)})
-    return jsonify({"date": None})
+    return jsonify({"date": get_subscription_expiry_date()})
 
 @app.route("/settings/renewal", methods=["POST"])
 def update_renewal_route():
@@ -496,9 +839,16 @@ def update_demo_route():
 @app.route("/shutdown", methods=["POST"])
 def shutdown_server():
     """Completely terminates the Flask application and PyInstaller process."""
+    if app.config["LOCAL_SHUTDOWN_ONLY"] and request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"message": "Shutdown is only allowed from the server machine"}), 403
     try:
         def kill_process():
             time.sleep(1)
+            # Finish requests other terminals already sent before exiting
+            drain_server()
+            flush_attendance_queue()
+            flush_audit_log()
+            close_all_connections()
             os.kill(os.getpid(), signal.SIGTERM)
 
         threading.Thread(target=kill_process).start()
@@ -507,6 +857,64 @@ def shutdown_server():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+def parse_server_args(argv=None):
+    parser = argparse.ArgumentParser(description="Attendance web app server")
+    parser.add_argument("--host", default=os.environ.get("ATTENDANCE_HOST"),
+                        help="Interface to bind (default 127.0.0.1, or 0.0.0.0 with --headless)")
+    parser.add_argument("--port", type=int, default=_env_int("ATTENDANCE_PORT", 5000))
+    parser.add_argument("--threads", type=int, default=_env_int("ATTENDANCE_THREADS", DEFAULT_THREADS),
+                        help="Worker threads serving requests")
+    parser.add_argument("--queue", type=int, default=_env_int("ATTENDANCE_QUEUE", DEFAULT_QUEUE_SIZE),
+                        help="Accepted connections waiting for a worker before returning 503")
+    parser.add_argument("--backlog", type=int, default=_env_int("ATTENDANCE_BACKLOG", DEFAULT_BACKLOG),
+                        help="Listen backlog")
+    parser.add_argument("--keepalive", type=int,
+                        default=_env_int("ATTENDANCE_KEEPALIVE", DEFAULT_KEEPALIVE_SECONDS),
+                        help="Seconds an idle keep-alive connection stays open (0 disables keep-alive)")
+    parser.add_argument("--headless", action="store_true",
+                        default=os.environ.get("ATTENDANCE_HEADLESS") == "1",
+                        help="LAN server mode: listen on all interfaces and do not open a browser")
+    parser.add_argument("--write-behind", action="store_true",
+                        default=os.environ.get("ATTENDANCE_WRITE_BEHIND") == "1",
+                        help="Acknowledge check-ins immediately and commit them in batches")
+    parser.add_argument("--bundle-assets", action="store_true",
+                        default=os.environ.get("ATTENDANCE_BUNDLE_ASSETS") == "1",
+                        help="Serve each page's scripts and stylesheets as one combined file")
+    parser.add_argument("--slow-query-ms", type=float,
+                        default=_env_float("ATTENDANCE_SLOW_QUERY_MS", None),
+                        help="Log SQL statements slower than this, and full table scans (off by default)")
+    parser.add_argument("--slow-query-log",
+                        default=os.environ.get("ATTENDANCE_SLOW_QUERY_LOG",
+                                               os.path.join(BASE_DIR, "logs", "slow_queries.log")),
+                        help="Rotating log file written by --slow-query-ms")
+    parser.add_argument("--dev", action="store_true",
+                        help="Use the Flask development server instead")
+    args = parser.parse_args(argv)
+    if args.host is None:
+        args.host = "0.0.0.0" if args.headless else "127.0.0.1"
+    return args
+
 if __name__ == "__main__":
-    threading.Timer(1.0, open_browser).start()
-    app.run(host="127.0.0.1", port=5000, debug=False, use_reloader=False)
\ No newline at end of file
+    args = parse_server_args()
+    app.config["WRITE_BEHIND_CHECKINS"] = args.write_behind
+    assets.bundle = args.bundle_assets
+    if args.slow_query_ms is not None:
+        enable_query_profiler(args.slow_query_log, args.slow_query_ms)
+    if args.headless:
+        app.config["LOCAL_SHUTDOWN_ONLY"] = True
+    else:
+        threading.Timer(1.0, open_browser, args=(args.port,)).start()
+
+    if args.dev:
+        app.run(host=args.host, port=args.port, debug=False, use_reloader=False)
+    else:
+        serve(app, host=args.host, port=args.port, threads=args.threads, queue_size=args.queue,
+              backlog=args.backlog, keepalive=args.keepalive)
\ No newline at end of file
@@ -1,7 +1,13 @@
 import sqlite3
+import mimetypes
 import os
 import sys
-from backend.utils.security import encrypt_password
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from backend.utils.security import encrypt_password, decrypt_password
+from backend.utils import query_profiler
 
 # ---------------------------------------------------------
 # PATH LOGIC FOR PYINSTALLER
@@ -18,15 +24,330 @@ os.makedirs(DB_FOLDER, exist_ok=True)
 DB_PATH = os.path.join(DB_FOLDER, "attendance.db")
 
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA foreign_keys = ON;")
+# ---------------------------------------------------------
+# CONNECTION POOL
+# ---------------------------------------------------------
+# Connections are opened and configured once, then reused. Each thread leases
+# one connection at a time; nested get_connection() calls on the same thread
+# (e.g. a service calling a helper) share that lease, and a request scope keeps
+# it for the whole Flask request instead of returning it after every query.
+BUSY_TIMEOUT_MS = 5000
+POOL_SIZE = 8
+
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL;",
+    "PRAGMA synchronous = NORMAL;",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS};",
+    "PRAGMA cache_size = -8000;",        # ~8 MB page cache
+    "PRAGMA mmap_size = 67108864;",      # 64 MB memory-mapped I/O
+    "PRAGMA temp_store = MEMORY;",
+    "PRAGMA foreign_keys = ON;",
+)
+
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+_local = threading.local()
+
+
+# ---------------------------------------------------------
+# STATEMENT INSTRUMENTATION
+# ---------------------------------------------------------
+# Every connection counts the statements it runs through a trace callback
+# and times execute/fetch calls through InstrumentedCursor. The figures
+# are kept per thread, so a request only sees its own statements. When the
+# slow-query profiler is enabled each statement is also handed to it.
+
+def _count_statement(sql):
+    # Statements run inside triggers are reported as "-- TRIGGER ..." lines,
+    # and the profiler's EXPLAIN QUERY PLAN lookups are not the caller's
+    if not sql.startswith("--") and not getattr(_local, "profiling", False):
+        _local.sql_count = getattr(_local, "sql_count", 0) + 1
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Times execute and fetch calls. While the slow-query profiler is enabled,
+    a statement's time also covers the fetches that read its rows, and it
+    is handed to the profiler once its rows are exhausted or the cursor is
+    closed, reused or discarded.
+    """
+
+    _profiled = None  # [seconds, sql, parameters, many] of the open statement
+
+    def _timed_call(self, method, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _local.sql_seconds = getattr(_local, "sql_seconds", 0.0) + elapsed
+            if self._profiled is not None:
+                self._profiled[0] += elapsed
+
+    def _start_statement(self, args, many):
+        self._finish_statement()
+        if query_profiler.enabled and args:
+            self._profiled = [0.0, args[0], args[1] if len(args) > 1 else (), many]
+
+    def _finish_statement(self):
+        profiled, self._profiled = self._profiled, None
+        if profiled is None:
+            return
+        _local.profiling = True
+        try:
+            query_profiler.observe_statement(self.connection, *profiled)
+        except Exception as e:
+            print(f"Warning: query profiler failed: {e}")
+        finally:
+            _local.profiling = False
+
+    def execute(self, *args, **kwargs):
+        self._start_statement(args, many=False)
+        try:
+            return self._timed_call(sqlite3.Cursor.execute, *args, **kwargs)
+        finally:
+            if self.description is None:  # no rows to fetch
+                self._finish_statement()
+
+    def executemany(self, *args, **kwargs):
+        self._start_statement(args, many=True)
+        try:
+            return self._timed_call(sqlite3.Cursor.executemany, *args, **kwargs)
+        finally:
+            self._finish_statement()
+
+    def executescript(self, *args, **kwargs):
+        self._finish_statement()
+        return self._timed_call(sqlite3.Cursor.executescript, *args, **kwargs)
+
+    def fetchone(self):
+        row = self._timed_call(sqlite3.Cursor.fetchone)
+        if row is None:
+            self._finish_statement()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed_call(sqlite3.Cursor.fetchmany, size)
+        if len(rows) < size:
+            self._finish_statement()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed_call(sqlite3.Cursor.fetchall)
+        self._finish_statement()
+        return rows
+
+    def __next__(self):
+        try:
+            return self._timed_call(sqlite3.Cursor.__next__)
+        except StopIteration:
+            self._finish_statement()
+            raise
+
+    def close(self):
+        self._finish_statement()
+        super().close()
+
+    def __del__(self):
+        # e.g. conn.execute(...).fetchone() on a single-row lookup
+        if self._profiled is not None:
+            self._finish_statement()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    # The execute shortcuts are routed through cursor() so they are timed too
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def reset_statement_stats():
+    """Starts a fresh statement count/time for the current thread."""
+    _local.sql_count = 0
+    _local.sql_seconds = 0.0
+
+
+def get_statement_stats():
+    """Returns (statements executed, seconds spent in SQLite) for the current thread."""
+    return getattr(_local, "sql_count", 0), getattr(_local, "sql_seconds", 0.0)
+
+
+def open_connection():
+    """Opens a new, fully configured connection that is not managed by the pool."""
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                           factory=InstrumentedConnection)
+    conn.set_trace_callback(_count_statement)
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
-def employee_db():
+
+def _acquire():
+    """Returns the connection leased by this thread, leasing one if needed."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            conn = open_connection()
+        _local.conn = conn
+        _local.refs = 0
+        _local.tx_depth = 0
+        _local.handles = 0
+        _local.lease = object()  # identifies this lease to the handles taken from it
+    _local.refs += 1
+    return conn
+
+
+def _release():
+    """
+    Drops one reference to this thread's lease. At zero, uncommitted work is
+    rolled back and the connection goes back to the pool.
+    """
+    _local.refs -= 1
+    if _local.refs > 0:
+        return
+    conn = _local.conn
+    _local.conn = None
+    _local.lease = None
+    if conn.in_transaction:
+        conn.rollback()
+    try:
+        _pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
+class PooledConnection:
+    """
+    Handle returned by get_connection(). Behaves like sqlite3.Connection, but
+    close() hands the underlying connection back to the pool, and commit() is
+    deferred while an enclosing transaction() block is open.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._closed = False
+        self._lease = _local.lease
+        _local.handles += 1
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def commit(self):
+        if _local.tx_depth == 0:
+            self._conn.commit()
+
+    def rollback(self):
+        if _local.tx_depth == 0:
+            self._conn.rollback()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if getattr(_local, "lease", None) is not self._lease:
+            return  # Lease already released, e.g. by end_request_scope()
+        _local.handles -= 1
+        # Every handle on this thread shares one connection, so closing an
+        # inner handle (a helper called by a service) must not roll back its
+        # caller's pending writes. When the outermost handle closes outside
+        # transaction(), uncommitted work is discarded, exactly as closing
+        # a standalone sqlite3 connection would do.
+        if _local.handles == 0 and _local.tx_depth == 0 and self._conn.in_transaction:
+            self._conn.rollback()
+        _release()
+
+    def __del__(self):
+        # A service that raised before close() still gets its writes discarded
+        # once its handle is dropped (only on the thread that holds the lease)
+        if not self._closed and getattr(_local, "lease", None) is self._lease:
+            self.close()
+
+
+def get_connection():
+    return PooledConnection(_acquire())
+
+
+@contextmanager
+def transaction():
+    """
+    Runs the enclosed block as one transaction on this thread's connection.
+    Services called inside it share the transaction; their commit() calls are
+    deferred until the block exits, and any exception rolls everything back.
+    """
     conn = get_connection()
-    cursor = conn.cursor()
+    _local.tx_depth += 1
+    try:
+        if _local.tx_depth == 1 and not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        yield conn
+    except BaseException:
+        _local.tx_depth -= 1
+        if _local.tx_depth == 0:
+            conn.rollback()
+        raise
+    else:
+        _local.tx_depth -= 1
+        if _local.tx_depth == 0:
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def begin_request_scope():
+    """Pins this thread's connection for the rest of the request."""
+    _acquire()
+
 
+def end_request_scope():
+    """
+    Releases the connection pinned by begin_request_scope(). Any handle a
+    service failed to close (e.g. after an unexpected sqlite3 error) is
+    released with it, so a lease can never outlive its request.
+    """
+    if getattr(_local, "conn", None) is not None:
+        _local.refs = 1
+        _local.tx_depth = 0
+        _release()
+
+
+def close_all_connections():
+    """Checkpoints the WAL and closes every idle pooled connection (used on shutdown)."""
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        except sqlite3.Error:
+            pass
+        conn.close()
+
+# Recomputes every attendance_monthly row from attendance in one pass
+ROLLUP_REBUILD_SQL = """
+    INSERT OR REPLACE INTO attendance_monthly
+        (employee_id, month, days_present, total_hours, last_updated)
+    SELECT employee_id,
+           substr(date, 1, 7),
+           COUNT(check_in),
+           COALESCE(SUM(worked_hours), 0.0),
+           strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime')
+    FROM attendance
+    GROUP BY employee_id, substr(date, 1, 7)
+"""
+
+def _migration_base_schema(cursor):
     # =========================
     # EMPLOYEE RECORDS
     # =========================
@@ -87,33 +408,6 @@ def employee_db():
         )
     """)
     
-    # =========================
-    # SEEDING & REPAIR (Reversible Encryption)
-    # =========================
-    # Generate encrypted passwords (not one-way hashes)
-    admin_enc = encrypt_password('admin')
-    dev_enc = encrypt_password('DEV1234')
-
-    # 1. Ensure users exist
-    cursor.execute("""
-        INSERT OR IGNORE INTO users (username, password_hash, role)
-        VALUES ('admin', ?, 'admin')
-    """, (admin_enc,))
-
-    cursor.execute("""
-        INSERT OR IGNORE INTO users (username, password_hash, role)
-        VALUES ('developer', ?, 'head')
-    """, (dev_enc,))
-
-    # 2. FORCE UPDATE to ensure correct encryption is applied
-    cursor.execute("""
-        UPDATE users SET password_hash = ? WHERE username = 'admin'
-    """, (admin_enc,))
-
-    cursor.execute("""
-        UPDATE users SET password_hash = ? WHERE username = 'developer'
-    """, (dev_enc,))
-
     # =========================
     # SYSTEM SETTINGS (New)
     # =========================
@@ -124,18 +418,6 @@ def employee_db():
         )
     """)
 
-    # Seed Default Working Hours (16)
-    cursor.execute("""
-        INSERT OR IGNORE INTO system_settings (setting_key, setting_value)
-        VALUES ('daily_hours', '16')
-    """)
-
-    # Seed Default Demo Mode (true)
-    cursor.execute("""
-        INSERT OR IGNORE INTO system_settings (setting_key, setting_value)
-        VALUES ('demo_mode', 'true')
-    """)
-
     # =========================
     # DOCUMENT TABLES
     # =========================
@@ -166,9 +448,265 @@ def employee_db():
         )
     """)
 
-    conn.commit()
+
+# Tables whose row changes are recorded in change_log for incremental backups
+CHANGE_LOG_TABLES = (
+    "employees",
+    "attendance",
+    "salary_cal",
+    "users",
+    "system_settings",
+    "employee_docs",
+    "audit_logs",
+    "employee_rate_snapshots",
+)
+
+def _install_change_log_triggers(cursor):
+    """
+    (Re)creates the AFTER INSERT/UPDATE/DELETE triggers that copy every row
+    change into change_log. Rebuilt on each setup so new columns are captured.
+    """
+    now = "strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')"
+    for table in CHANGE_LOG_TABLES:
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns = [row[1] for row in cursor.fetchall()]
+        row_json = "json_object('rowid', NEW.rowid, " + ", ".join(
+            f"'{col}', NEW.{col}" for col in columns
+        ) + ")"
+
+        triggers = {
+            "ins": ("INSERT", "'I'", "NEW.rowid", row_json),
+            "upd": ("UPDATE", "'U'", "OLD.rowid", row_json),
+            "del": ("DELETE", "'D'", "OLD.rowid", "NULL"),
+        }
+        for suffix, (event, op, row_id, data) in triggers.items():
+            name = f"trg_changelog_{table}_{suffix}"
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"""
+                CREATE TRIGGER {name} AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO change_log (ts, tbl, op, row_id, row_data)
+                    VALUES ({now}, '{table}', {op}, {row_id}, {data});
+                END
+            """)
+
+def _add_missing_columns(cursor, table, columns):
+    """Adds any of `columns` ((name, type) pairs) that an older database lacks."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in cursor.fetchall()}
+    for name, column_type in columns:
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+def _create_indexes(cursor):
+    # Uniqueness matches what check_in / generate_salary already enforce in code
+    unique_indexes = (
+        ("idx_attendance_employee_date", "attendance(employee_id, date)"),
+        ("idx_salary_employee_month", "salary_cal(employee_id, month)"),
+    )
+    for name, target in unique_indexes:
+        try:
+            cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {target}")
+        except sqlite3.IntegrityError:
+            # Legacy duplicate rows: fall back to a plain index so lookups stay fast
+            print(f"Warning: duplicate rows prevent unique index {name}; creating non-unique index")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance(date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_employees_status ON employees(status, employee_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_employee_docs_employee ON employee_docs(employee_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_employee_docs_hash ON employee_docs(content_hash)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp ON audit_logs(timestamp)")
+
+def _migration_seed_defaults(cursor):
+    # Default logins (reversible encryption, see utils/security.py)
+    cursor.execute("""
+        INSERT OR IGNORE INTO users (username, password_hash, role)
+        VALUES ('admin', ?, 'admin')
+    """, (encrypt_password('admin'),))
+
+    cursor.execute("""
+        INSERT OR IGNORE INTO users (username, password_hash, role)
+        VALUES ('developer', ?, 'head')
+    """, (encrypt_password('DEV1234'),))
+
+    # Databases from before versioning may hold the default logins in an
+    # older, non-decryptable format; repair those once instead of every start
+    defaults = {'admin': 'admin', 'developer': 'DEV1234'}
+    cursor.execute("SELECT user_id, username, password_hash FROM users WHERE username IN ('admin', 'developer')")
+    for user_id, username, password_hash in cursor.fetchall():
+        if decrypt_password(password_hash) == "Decryption Error":
+            cursor.execute("UPDATE users SET password_hash = ? WHERE user_id = ?",
+                           (encrypt_password(defaults[username]), user_id))
+
+    # Seed Default Working Hours (16)
+    cursor.execute("""
+        INSERT OR IGNORE INTO system_settings (setting_key, setting_value)
+        VALUES ('daily_hours', '16')
+    """)
+
+    # Seed Default Demo Mode (true)
+    cursor.execute("""
+        INSERT OR IGNORE INTO system_settings (setting_key, setting_value)
+        VALUES ('demo_mode', 'true')
+    """)
+
+def _migration_document_metadata(cursor):
+    _add_missing_columns(cursor, "employee_docs", (
+        ("content_hash", "TEXT"),
+        ("original_name", "TEXT"),
+        ("size_bytes", "INTEGER"),
+        ("mime_type", "TEXT"),
+        ("file_mtime", "REAL"),
+    ))
+
+    # Fill in what can be read from files uploaded before these columns
+    # existed, so listings and downloads never need to stat files
+    cursor.execute("""
+        SELECT doc_id, file_path FROM employee_docs
+        WHERE size_bytes IS NULL AND file_path IS NOT NULL
+    """)
+    updates = []
+    for doc_id, file_path in cursor.fetchall():
+        abs_path = os.path.join(BASE_DIR, file_path)
+        if not os.path.exists(abs_path):
+            continue
+        stat = os.stat(abs_path)
+        name = os.path.basename(file_path)
+        updates.append((stat.st_size, stat.st_mtime, name,
+                        mimetypes.guess_type(name)[0] or "application/octet-stream", doc_id))
+    cursor.executemany("""
+        UPDATE employee_docs
+        SET size_bytes = ?, file_mtime = ?,
+            original_name = COALESCE(original_name, ?),
+            mime_type = COALESCE(mime_type, ?)
+        WHERE doc_id = ?
+    """, updates)
+
+def _migration_rate_snapshots(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS employee_rate_snapshots(
+            employee_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            hourly_rate REAL,
+            daily_hours REAL,
+            recorded_at TEXT,
+            PRIMARY KEY (employee_id, month),
+            FOREIGN KEY (employee_id) REFERENCES employees(employee_id)
+        )
+    """)
+
+def _migration_monthly_rollup(cursor):
+    # Derived from attendance and kept current by services/attendance.py
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS attendance_monthly(
+            employee_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            days_present INTEGER NOT NULL DEFAULT 0,
+            total_hours REAL NOT NULL DEFAULT 0,
+            last_updated TEXT,
+            PRIMARY KEY (employee_id, month),
+            FOREIGN KEY (employee_id) REFERENCES employees(employee_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(ROLLUP_REBUILD_SQL)
+
+def _migration_change_log(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log(
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts TEXT NOT NULL,
+            tbl TEXT NOT NULL,
+            op TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            row_data TEXT
+        )
+    """)
+
+def _migration_settings_generation(cursor):
+    # Bumped by triggers on every system_settings change, so the settings
+    # cache can tell a settings change apart from any other write
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS settings_generation(
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            generation INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO settings_generation (id, generation) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_settings_generation_{event.lower()}
+            AFTER {event} ON system_settings
+            BEGIN
+                UPDATE settings_generation SET generation = generation + 1 WHERE id = 1;
+            END
+        """)
+
+
+# ---------------------------------------------------------
+# SCHEMA MIGRATIONS
+# ---------------------------------------------------------
+# Applied in order, once each, and recorded in schema_version. Every step
+# must also be safe on databases created before versioning existed (they
+# start at version 0), hence IF NOT EXISTS / _add_missing_columns.
+# Append new steps; never renumber or edit an applied one.
+SCHEMA_MIGRATIONS = (
+    (1, "base schema", _migration_base_schema),
+    (2, "seed default users and settings", _migration_seed_defaults),
+    (3, "document content hash and file metadata", _migration_document_metadata),
+    (4, "hourly rate snapshots", _migration_rate_snapshots),
+    (5, "monthly attendance rollup", _migration_monthly_rollup),
+    (6, "change log for incremental backups", _migration_change_log),
+    (7, "lookup indexes", _create_indexes),
+    (8, "settings generation counter", _migration_settings_generation),
+)
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+def _current_schema_version(cursor):
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+    except sqlite3.OperationalError:
+        return 0 # Fresh install or a database from before versioning
+    return cursor.fetchone()[0] or 0
+
+def employee_db():
+    """
+    Brings the database schema up to date. A database that is already
+    current costs a single version lookup.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    up_to_date = _current_schema_version(cursor) >= SCHEMA_VERSION
     cursor.close()
     conn.close()
+    if up_to_date:
+        return
+
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version(
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TEXT NOT NULL
+            )
+        """)
+        # Re-read under the write lock in case another process migrated first
+        current = _current_schema_version(cursor)
+        for version, description, migrate in SCHEMA_MIGRATIONS:
+            if version <= current:
+                continue
+            print(f"Applying schema migration {version}: {description}")
+            migrate(cursor)
+            cursor.execute("""
+                INSERT INTO schema_version (version, description, applied_at)
+                VALUES (?, ?, strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'))
+            """, (version, description))
+
+        # Triggers copy every column, so rebuild them whenever the schema moved
+        _install_change_log_triggers(cursor)
+        cursor.close()
+
 
 if __name__ == "__main__":
     employee_db()
\ No newline at end of file
@@ -0,0 +1,179 @@
+import logging
+import queue
+import socket
+import threading
+import time
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+from backend.database import POOL_SIZE
+
+try:
+    from waitress.server import create_server as create_waitress_server
+except ImportError:  # waitress is optional; fall back to the pooled Werkzeug server
+    create_waitress_server = None
+
+# -------------------------
+# PRODUCTION SERVER
+# -------------------------
+# A fixed number of worker threads serve requests, the number of
+# connections waiting for a worker is capped, and drain_server() lets
+# in-flight requests finish before the process exits.
+#
+# Waitress is used when installed: it supports HTTP/1.1 keep-alive and
+# buffers slow clients off the worker threads. It is optional (the repo
+# pins no requirements), so install it with `pip install waitress` before
+# building the executable. Without it, a bounded pool on top of
+# Werkzeug's handler is used and a warning is logged at startup; that
+# handler closes every connection after one response, so keep-alive only
+# sets the socket timeout there.
+
+DEFAULT_THREADS = POOL_SIZE     # one pooled DB connection per worker
+DEFAULT_QUEUE_SIZE = 64         # connections allowed to wait for a free worker
+DEFAULT_BACKLOG = 128           # connections waiting in the kernel for accept()
+DEFAULT_KEEPALIVE_SECONDS = 5   # idle time before a connection is closed
+DEFAULT_DRAIN_SECONDS = 10
+
+_BUSY_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Retry-After: 1\r\n"
+    b"Content-Length: 0\r\n"
+    b"Connection: close\r\n\r\n"
+)
+
+_active_server = None
+
+logger = logging.getLogger(__name__)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug's WSGI server with a bounded worker pool instead of a thread per request."""
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads=DEFAULT_THREADS, queue_size=DEFAULT_QUEUE_SIZE,
+                 backlog=DEFAULT_BACKLOG, keepalive=DEFAULT_KEEPALIVE_SECONDS):
+        handler = type("PooledRequestHandler", (WSGIRequestHandler,), {
+            "protocol_version": "HTTP/1.1",
+            "timeout": keepalive or None,
+        })
+        self.request_queue_size = backlog
+        super().__init__(host, port, app, handler=handler)
+
+        # Connections beyond the workers and this queue get an immediate 503
+        self._pending = queue.Queue(maxsize=queue_size)
+        self._workers = [
+            threading.Thread(target=self._work, name=f"http-worker-{i + 1}", daemon=True)
+            for i in range(threads)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def process_request(self, request, client_address):
+        try:
+            self._pending.put_nowait((request, client_address))
+        except queue.Full:
+            try:
+                request.sendall(_BUSY_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+
+    def _work(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def drain(self, timeout=DEFAULT_DRAIN_SECONDS):
+        """
+        Stops accepting connections and waits for queued and in-flight
+        requests to finish. Must not be called from the serving thread.
+        """
+        self.shutdown()
+        for _ in self._workers:
+            self._pending.put(None)
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(0, deadline - time.monotonic()))
+        self.server_close()
+
+
+class WaitressServer:
+    """Adapts a waitress server to the serve_forever()/drain() interface."""
+
+    def __init__(self, host, port, app, threads=DEFAULT_THREADS, queue_size=DEFAULT_QUEUE_SIZE,
+                 backlog=DEFAULT_BACKLOG, keepalive=DEFAULT_KEEPALIVE_SECONDS):
+        self._server = create_waitress_server(
+            app,
+            host=host,
+            port=port,
+            threads=threads,
+            # Beyond this many open connections waitress stops accepting
+            # and new ones wait in the listen backlog
+            connection_limit=threads + queue_size,
+            backlog=backlog,
+            channel_timeout=keepalive or 1,
+            ident="attendance"
+        )
+        self.port = self._server.effective_port
+
+    def serve_forever(self):
+        self._server.run()
+
+    def _busy(self):
+        dispatcher = self._server.task_dispatcher
+        if dispatcher.queue or dispatcher.active_count:
+            return True
+        # Responses are written by the server loop after the task finishes
+        return any(
+            getattr(channel, "total_outbufs_len", 0) or getattr(channel, "requests", None)
+            for channel in list(self._server._map.values())
+            if channel is not self._server
+        )
+
+    def drain(self, timeout=DEFAULT_DRAIN_SECONDS):
+        """Stops accepting connections and waits for in-flight requests to be answered."""
+        self._server.accepting = False
+        deadline = time.monotonic() + timeout
+        while self._busy() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._server.task_dispatcher.shutdown(cancel_pending=False,
+                                              timeout=max(0, deadline - time.monotonic()))
+
+
+def serve(app, host="127.0.0.1", port=5000, threads=DEFAULT_THREADS, queue_size=DEFAULT_QUEUE_SIZE,
+          backlog=DEFAULT_BACKLOG, keepalive=DEFAULT_KEEPALIVE_SECONDS):
+    """Serves `app` until drain_server() is called."""
+    global _active_server
+    if create_waitress_server is None:
+        logger.warning("waitress is not installed; using the fallback Werkzeug worker pool "
+                       "without keep-alive (pip install waitress)")
+    server_class = WaitressServer if create_waitress_server else PooledWSGIServer
+    server = server_class(host, port, app, threads=threads, queue_size=queue_size,
+                          backlog=backlog, keepalive=keepalive)
+    _active_server = server
+    display_host = socket.gethostname() if host in ("0.0.0.0", "::") else host
+    engine = "waitress" if create_waitress_server else "werkzeug pool"
+    print(f"Serving on http://{display_host}:{server.port} "
+          f"({engine}, {threads} threads, queue {queue_size}, keep-alive {keepalive}s)")
+    try:
+        server.serve_forever()
+    finally:
+        _active_server = None
+
+logger = logging.getLogger(__name__)
+
+
+def drain_server(timeout=DEFAULT_DRAIN_SECONDS):
+    """Drains the running server, if any. Returns True if one was running."""
+    server = _active_server
+    if server is None:
+        return False
+    server.drain(timeout)
+    return True
@@ -1,19 +1,73 @@
 from datetime import datetime, date
-from backend.database import get_connection
+from backend.database import get_connection, transaction, ROLLUP_REBUILD_SQL
+from backend.services.audit import record_audit
+from backend.utils.dates import month_date_range
+from backend.utils.pagination import encode_cursor, decode_cursor
 
 
-def check_in(employee_id, custom_time=None, target_date=None):
+def _resolve_date_time(custom_time=None, target_date=None):
+    """Returns the (date, time) pair an attendance action applies to."""
     # Use target_date if provided (Admin/Head), else today
-    today = target_date if target_date else date.today().isoformat()
-    
+    day = target_date if target_date else date.today().isoformat()
+
     # Use custom time if provided (Head Override), else current time
     if custom_time:
         # Ensure format allows adding minutes/seconds if user only sent HH:MM
         if len(custom_time) == 5: # HH:MM
             custom_time += ":00"
-        now = custom_time
-    else:
-        now = datetime.now().strftime("%H:%M:%S")
+        return day, custom_time
+    return day, datetime.now().strftime("%H:%M:%S")
+
+
+def _audit_override(action, employee_id, day, at_time, custom_time, target_date):
+    """Records manual (Admin/Head) attendance times and dates."""
+    if custom_time or target_date:
+        record_audit(action, f"employee:{employee_id}", f"date={day} time={at_time}")
+
+
+# ---------------------------------------------------------
+# MONTHLY ROLLUP
+# ---------------------------------------------------------
+def refresh_monthly_rollup(cursor, changes):
+    """
+    Recomputes the attendance_monthly rows touched by `changes`, an iterable
+    of (employee_id, date) pairs. Each row is re-aggregated from that one
+    employee-month, an index range of at most 31 attendance rows.
+    Call it on the same cursor/transaction that changed attendance.
+    """
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    params = []
+    for employee_id, month in sorted({(emp, day[:7]) for emp, day in changes}):
+        start, end = month_date_range(month)
+        params.append((employee_id, month, now, employee_id, start, end))
+
+    cursor.executemany("""
+        INSERT INTO attendance_monthly
+            (employee_id, month, days_present, total_hours, last_updated)
+        SELECT ?, ?, COUNT(check_in), COALESCE(SUM(worked_hours), 0.0), ?
+        FROM attendance
+        WHERE employee_id = ? AND date >= ? AND date < ?
+        ON CONFLICT(employee_id, month) DO UPDATE SET
+            days_present = excluded.days_present,
+            total_hours = excluded.total_hours,
+            last_updated = excluded.last_updated
+    """, params)
+
+
+def rebuild_monthly_rollup():
+    """Rebuilds attendance_monthly from scratch (repair / after restores)."""
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM attendance_monthly")
+        cursor.execute(ROLLUP_REBUILD_SQL)
+        cursor.execute("SELECT COUNT(*) FROM attendance_monthly")
+        rows = cursor.fetchone()[0]
+        cursor.close()
+    return rows
+
+
+def check_in(employee_id, custom_time=None, target_date=None):
+    today, now = _resolve_date_time(custom_time, target_date)
 
     conn = get_connection()
     cursor = conn.cursor()
@@ -68,21 +122,15 @@ def check_in(employee_id, custom_time=None, target_date=None):
             VALUES (?, ?, ?)
         """, (employee_id, today, now))
 
+    refresh_monthly_rollup(cursor, [(employee_id, today)])
     conn.commit()
     cursor.close()
     conn.close()
+    _audit_override("attendance_checkin_override", employee_id, today, now, custom_time, target_date)
 
 
 def check_out(employee_id, custom_time=None, target_date=None):
-    today = target_date if target_date else date.today().isoformat()
-    
-    # Use custom time if provided
-    if custom_time:
-        if len(custom_time) == 5:
-            custom_time += ":00"
-        now = custom_time
-    else:
-        now = datetime.now().strftime("%H:%M:%S")
+    today, now = _resolve_date_time(custom_time, target_date)
 
     conn = get_connection()
     cursor = conn.cursor()
@@ -129,24 +177,301 @@ def check_out(employee_id, custom_time=None, target_date=None):
         WHERE attendance_id = ?
     """, (now, worked_hours, attendance_id))
 
+    refresh_monthly_rollup(cursor, [(employee_id, today)])
     conn.commit()
     cursor.close()
     conn.close()
+    _audit_override("attendance_checkout_override", employee_id, today, now, custom_time, target_date)
+
+
+def _existing_employee_ids(cursor, employee_ids):
+    placeholders = ",".join("?" * len(employee_ids))
+    cursor.execute(f"""
+        SELECT employee_id FROM employees WHERE employee_id IN ({placeholders})
+    """, employee_ids)
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _attendance_for_date(cursor, employee_ids, day):
+    placeholders = ",".join("?" * len(employee_ids))
+    cursor.execute(f"""
+        SELECT employee_id, attendance_id, check_in, check_out, locked
+        FROM attendance
+        WHERE date = ? AND employee_id IN ({placeholders})
+    """, [day, *employee_ids])
+    return {row[0]: row[1:] for row in cursor.fetchall()}
+
+
+def _dedupe_ids(employee_ids):
+    """Normalises a client-supplied ID list to unique ints, preserving order."""
+    return list(dict.fromkeys(int(emp_id) for emp_id in employee_ids or []))
+
+
+def bulk_check_in(employee_ids, custom_time=None, target_date=None):
+    """
+    Checks in many employees for one date in a single transaction.
+    Follows the same rules as check_in() and returns one result dict per
+    employee: {"employee_id", "ok", "message"}.
+    """
+    employee_ids = _dedupe_ids(employee_ids)
+    if not employee_ids:
+        raise ValueError("No employees selected")
+
+    today, now = _resolve_date_time(custom_time, target_date)
+    results = []
+    inserts = []
+    updates = []
+
+    with transaction() as conn:
+        cursor = conn.cursor()
+        known_ids = _existing_employee_ids(cursor, employee_ids)
+        existing = _attendance_for_date(cursor, employee_ids, today)
+
+        for emp_id in employee_ids:
+            if emp_id not in known_ids:
+                results.append({"employee_id": emp_id, "ok": False, "message": "Employee not found"})
+                continue
+
+            record = existing.get(emp_id)
+            if record is None:
+                inserts.append((emp_id, today, now))
+            elif custom_time:
+                attendance_id, _, current_check_out, _ = record
+                worked_hours = None
+                if current_check_out:
+                    try:
+                        check_in_dt = datetime.strptime(now, "%H:%M:%S")
+                        check_out_dt = datetime.strptime(current_check_out, "%H:%M:%S")
+                        if check_out_dt < check_in_dt:
+                            worked_hours = 0.0
+                        else:
+                            worked_hours = (check_out_dt - check_in_dt).seconds / 3600
+                    except ValueError:
+                        pass # Ignore time format errors during recalc
+                updates.append((now, worked_hours, worked_hours, attendance_id))
+            else:
+                results.append({"employee_id": emp_id, "ok": False, "message": "Already checked in for this date"})
+                continue
+
+            results.append({"employee_id": emp_id, "ok": True, "message": "Check-in successful"})
+
+        cursor.executemany("""
+            INSERT INTO attendance (employee_id, date, check_in)
+            VALUES (?, ?, ?)
+        """, inserts)
+        # worked_hours is only rewritten when a check-out exists to recalc from
+        cursor.executemany("""
+            UPDATE attendance
+            SET check_in = ?,
+                worked_hours = CASE WHEN ? IS NULL THEN worked_hours ELSE ? END
+            WHERE attendance_id = ?
+        """, updates)
+        refresh_monthly_rollup(cursor, [(r["employee_id"], today) for r in results if r["ok"]])
+        cursor.close()
+
+    for r in results:
+        if r["ok"]:
+            _audit_override("attendance_checkin_override", r["employee_id"], today, now, custom_time, target_date)
+    return results
+
+
+def bulk_check_out(employee_ids, custom_time=None, target_date=None):
+    """
+    Checks out many employees for one date in a single transaction.
+    Follows the same rules as check_out() and returns one result dict per
+    employee: {"employee_id", "ok", "message"}.
+    """
+    employee_ids = _dedupe_ids(employee_ids)
+    if not employee_ids:
+        raise ValueError("No employees selected")
+
+    today, now = _resolve_date_time(custom_time, target_date)
+    results = []
+    updates = []
+
+    with transaction() as conn:
+        cursor = conn.cursor()
+        existing = _attendance_for_date(cursor, employee_ids, today)
+
+        for emp_id in employee_ids:
+            record = existing.get(emp_id)
+            if record is None:
+                results.append({"employee_id": emp_id, "ok": False, "message": "No check-in found for this date"})
+                continue
+
+            attendance_id, check_in_time, _, locked = record
+            if locked and not custom_time:
+                results.append({"employee_id": emp_id, "ok": False, "message": "Attendance record is locked"})
+                continue
+
+            try:
+                check_in_dt = datetime.strptime(check_in_time, "%H:%M:%S")
+                check_out_dt = datetime.strptime(now, "%H:%M:%S")
+                if check_out_dt < check_in_dt:
+                    raise ValueError("Check-out time cannot be before check-in time")
+                worked_hours = (check_out_dt - check_in_dt).seconds / 3600
+            except ValueError as ve:
+                results.append({"employee_id": emp_id, "ok": False, "message": f"Time Calculation Error: {str(ve)}"})
+                continue
+
+            updates.append((now, worked_hours, attendance_id))
+            results.append({"employee_id": emp_id, "ok": True, "message": "Check-out successful"})
+
+        cursor.executemany("""
+            UPDATE attendance
+            SET check_out = ?, worked_hours = ?
+            WHERE attendance_id = ?
+        """, updates)
+        refresh_monthly_rollup(cursor, [(r["employee_id"], today) for r in results if r["ok"]])
+        cursor.close()
+
+    for r in results:
+        if r["ok"]:
+            _audit_override("attendance_checkout_override", r["employee_id"], today, now, custom_time, target_date)
+    return results
+
+
+MAX_HISTORY_PAGE_SIZE = 500
+
+def _history_filters(employee_id, date_from, date_to):
+    where = ["employee_id = ?"]
+    params = [employee_id]
+    if date_from:
+        where.append("date >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("date <= ?")
+        params.append(date_to)
+    return where, params
+
+
+def get_attendance_by_employee(employee_id, date_from=None, date_to=None, limit=None, cursor=None):
+    """
+    Returns an employee's attendance, newest first, optionally limited to
+    dates between date_from and date_to (inclusive, YYYY-MM-DD) and paged.
+    Returns a dict: {"records": [dict, ...], "next_cursor": str|None}.
+    """
+    where, params = _history_filters(employee_id, date_from, date_to)
+    if cursor:
+        last_date, last_id = decode_cursor(cursor, 2)
+        where.append("(date, attendance_id) < (?, ?)")
+        params.extend([last_date, last_id])
+    if limit is not None:
+        limit = max(1, min(int(limit), MAX_HISTORY_PAGE_SIZE))
+
+    sql = f"""
+        SELECT date, check_in, check_out, worked_hours, attendance_id
+        FROM attendance
+        WHERE {' AND '.join(where)}
+        ORDER BY date DESC, attendance_id DESC
+    """
+    if limit is not None:
+        # One extra row tells us whether another page exists
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+
+    conn = get_connection()
+    db_cursor = conn.cursor()
+    db_cursor.execute(sql, params)
+    rows = db_cursor.fetchall()
+    db_cursor.close()
+    conn.close()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][0], rows[-1][4])
 
+    records = [{
+        "date": r[0],
+        "check_in": r[1],
+        "check_out": r[2],
+        "worked_hours": r[3]
+    } for r in rows]
+    return {"records": records, "next_cursor": next_cursor}
 
-def get_attendance_by_employee(employee_id):
+
+def get_attendance_monthly_summary(employee_id, date_from=None, date_to=None):
+    """Per-month days present and total hours for an employee, newest month first."""
     conn = get_connection()
     cursor = conn.cursor()
 
-    cursor.execute("""
-        SELECT date, check_in, check_out, worked_hours
-        FROM attendance
-        WHERE employee_id = ?
-        ORDER BY date DESC
-    """, (employee_id,))
+    if not date_from and not date_to:
+        # Whole history: one precomputed row per month
+        cursor.execute("""
+            SELECT month, days_present, total_hours
+            FROM attendance_monthly
+            WHERE employee_id = ?
+            ORDER BY month DESC
+        """, (employee_id,))
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        return [{"month": r[0], "days_present": r[1], "total_hours": r[2]} for r in rows if r[1]]
 
+    where, params = _history_filters(employee_id, date_from, date_to)
+    cursor.execute(f"""
+        SELECT substr(date, 1, 7) AS month,
+               COUNT(check_in),
+               COALESCE(SUM(worked_hours), 0.0)
+        FROM attendance
+        WHERE {' AND '.join(where)}
+        GROUP BY month
+        ORDER BY month DESC
+    """, params)
     rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    return [{"month": r[0], "days_present": r[1], "total_hours": r[2]} for r in rows]
 
+
+def get_attendance_board(target_date=None):
+    """
+    Returns every active employee with their attendance for one date
+    (default today): {"date", "counts", "employees": [dict, ...]}.
+    Employees with no row for the date come back with null times.
+    """
+    day = date.fromisoformat(target_date).isoformat() if target_date else date.today().isoformat()
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    # Walks idx_employees_status, then one idx_attendance_employee_date probe per employee
+    cursor.execute("""
+        SELECT e.employee_id, e.name, e.role,
+               a.check_in, a.check_out, a.worked_hours, a.locked
+        FROM employees e
+        LEFT JOIN attendance a
+               ON a.employee_id = e.employee_id AND a.date = ?
+        WHERE e.status = 'active'
+        ORDER BY e.employee_id
+    """, (day,))
+    rows = cursor.fetchall()
     cursor.close()
     conn.close()
-    return rows
\ No newline at end of file
+
+    employees = [{
+        "employee_id": r[0],
+        "name": r[1],
+        "role": r[2],
+        "check_in": r[3],
+        "check_out": r[4],
+        "worked_hours": r[5],
+        "locked": r[6]
+    } for r in rows]
+    present = sum(1 for e in employees if e["check_in"])
+    checked_out = sum(1 for e in employees if e["check_out"])
+    return {
+        "date": day,
+        "counts": {
+            "active": len(employees),
+            "present": present,
+            "absent": len(employees) - present,
+            "checked_out": checked_out
+        },
+        "employees": employees
+    }
+
+
+if __name__ == "__main__":
+    print(f"Rebuilt {rebuild_monthly_rollup()} monthly rollup rows")
@@ -0,0 +1,237 @@
+import argparse
+import csv
+import json
+import sys
+from contextlib import nullcontext
+from datetime import date
+from backend.database import get_connection, transaction
+from backend.services.attendance import refresh_monthly_rollup
+
+# ---------------------------------------------------------
+# PUNCH-CLOCK IMPORT
+# ---------------------------------------------------------
+# Accepts CSV exports from biometric devices. Required columns:
+#   employee_id, and either `timestamp` (YYYY-MM-DD HH:MM[:SS]) or `date` + `time`.
+# Optional column `direction` (in/out). Without it, the first punch of the day
+# is the check-in and the last one the check-out.
+BATCH_SIZE = 1000
+MAX_REPORTED_ISSUES = 100
+
+
+def _normalise_time(value):
+    """Returns HH:MM:SS and its seconds-since-midnight, or raises ValueError."""
+    parts = value.strip().split(":")
+    if len(parts) == 2:
+        parts.append("00")
+    if len(parts) != 3:
+        raise ValueError(f"Invalid time '{value}'")
+    hours, minutes, seconds = (int(p) for p in parts)
+    if not (0 <= hours < 24 and 0 <= minutes < 60 and 0 <= seconds < 60):
+        raise ValueError(f"Invalid time '{value}'")
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}", hours * 3600 + minutes * 60 + seconds
+
+
+def _normalise_date(value):
+    parts = value.strip().split("-")
+    if len(parts) != 3 or len(parts[0]) != 4:
+        raise ValueError(f"Invalid date '{value}'")
+    try:
+        # date() also rejects days the month does not have (2024-02-31)
+        return date(*(int(p) for p in parts)).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}'")
+
+
+def _seconds(time_str):
+    hours, minutes, seconds = (int(p) for p in time_str.split(":"))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def _worked_hours(check_in_time, check_out_time):
+    if not check_in_time or not check_out_time:
+        return None
+    diff = _seconds(check_out_time) - _seconds(check_in_time)
+    if diff < 0:
+        return None
+    return diff / 3600
+
+
+def _add_issue(issues, item):
+    if len(issues) < MAX_REPORTED_ISSUES:
+        issues.append(item)
+
+
+def parse_punches(lines, report):
+    """
+    Stream-parses punch rows and pairs them per employee per day.
+    Returns {(employee_id, date): [check_in, check_out]} with times as HH:MM:SS.
+    """
+    reader = csv.DictReader(lines)
+    fields = {name.strip().lower() for name in (reader.fieldnames or [])}
+    if "employee_id" not in fields or not ("timestamp" in fields or {"date", "time"} <= fields):
+        raise ValueError("CSV needs an employee_id column and either timestamp or date + time columns")
+
+    # day key -> [first_in_secs, first_in, last_out_secs, last_out]
+    days = {}
+    for line_no, raw in enumerate(reader, start=2):
+        report["rows_read"] += 1
+        row = {(k or "").strip().lower(): (v or "").strip() for k, v in raw.items()}
+        try:
+            employee_id = int(row["employee_id"])
+            if row.get("timestamp"):
+                day_part, _, time_part = row["timestamp"].replace("T", " ").partition(" ")
+            else:
+                day_part, time_part = row.get("date", ""), row.get("time", "")
+            day = _normalise_date(day_part)
+            time_str, secs = _normalise_time(time_part)
+        except (KeyError, ValueError) as e:
+            _add_issue(report["invalid_rows"], {"line": line_no, "reason": str(e)})
+            continue
+
+        direction = row.get("direction", "").lower()
+        entry = days.setdefault((employee_id, day), [None, None, None, None])
+        if direction != "out" and (entry[0] is None or secs < entry[0]):
+            entry[0], entry[1] = secs, time_str
+        if direction != "in" and (entry[2] is None or secs > entry[2]):
+            entry[2], entry[3] = secs, time_str
+        report["punches"] += 1
+
+    paired = {}
+    for key, (in_secs, in_time, out_secs, out_time) in days.items():
+        if in_time is None:
+            # Only "out" punches: nothing to anchor a check-in to
+            _add_issue(report["invalid_rows"], {"employee_id": key[0], "date": key[1],
+                                                "reason": "Check-out without check-in"})
+            continue
+        if out_secs is not None and out_secs <= in_secs:
+            out_time = None  # single punch, or out before in
+        paired[key] = [in_time, out_time]
+    return paired
+
+
+def _apply_batch(cursor, batch, report, dry_run):
+    employee_ids = sorted({emp for (emp, _), _ in batch})
+    dates = sorted({day for (_, day), _ in batch})
+    placeholders = ",".join("?" * len(employee_ids))
+    cursor.execute(f"""
+        SELECT employee_id, date, attendance_id, check_in, check_out, locked
+        FROM attendance
+        WHERE employee_id IN ({placeholders}) AND date >= ? AND date <= ?
+    """, [*employee_ids, dates[0], dates[-1]])
+    existing = {(r[0], r[1]): r[2:] for r in cursor.fetchall()}
+
+    inserts = []
+    updates = []
+    changed_keys = []
+    for (employee_id, day), (check_in_time, check_out_time) in batch:
+        record = existing.get((employee_id, day))
+        if record is None:
+            inserts.append((employee_id, day, check_in_time, check_out_time,
+                            _worked_hours(check_in_time, check_out_time)))
+            continue
+
+        attendance_id, current_in, current_out, locked = record
+        final_out = check_out_time
+        if final_out is None and current_out and _seconds(current_out) > _seconds(check_in_time):
+            final_out = current_out
+        if (current_in, current_out) == (check_in_time, final_out):
+            report["unchanged"] += 1
+            continue
+        if locked:
+            report["skipped_locked"] += 1
+            _add_issue(report["locked_rows"], {"employee_id": employee_id, "date": day})
+            continue
+
+        # Only filling in a missing check-out is a plain update; changing a
+        # time that is already recorded is reported as a conflict
+        if current_in != check_in_time or current_out is not None:
+            _add_issue(report["conflicts"], {
+                "employee_id": employee_id,
+                "date": day,
+                "existing": [current_in, current_out],
+                "imported": [check_in_time, final_out]
+            })
+        updates.append((check_in_time, final_out,
+                        _worked_hours(check_in_time, final_out), attendance_id))
+        changed_keys.append((employee_id, day))
+
+    report["inserted"] += len(inserts)
+    report["updated"] += len(updates)
+    if dry_run:
+        return
+
+    cursor.executemany("""
+        INSERT INTO attendance (employee_id, date, check_in, check_out, worked_hours)
+        VALUES (?, ?, ?, ?, ?)
+    """, inserts)
+    cursor.executemany("""
+        UPDATE attendance
+        SET check_in = ?, check_out = ?, worked_hours = ?
+        WHERE attendance_id = ?
+    """, updates)
+    refresh_monthly_rollup(cursor, [(row[0], row[1]) for row in inserts] + changed_keys)
+
+
+def import_attendance(lines, dry_run=False):
+    """
+    Imports punch-clock rows from an iterable of CSV lines (a text file or
+    stream). Punches are paired per employee per day, checked against the
+    employees table, and upserted into attendance in batched transactions.
+    Locked rows are never modified. With dry_run=True nothing is written and
+    the report describes what would happen.
+    """
+    report = {
+        "dry_run": bool(dry_run),
+        "rows_read": 0,
+        "punches": 0,
+        "days": 0,
+        "inserted": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "skipped_locked": 0,
+        "unknown_employees": [],
+        "invalid_rows": [],
+        "conflicts": [],
+        "locked_rows": []
+    }
+    paired = parse_punches(lines, report)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT employee_id FROM employees")
+    known_ids = {r[0] for r in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+
+    unknown = sorted({emp for emp, _ in paired if emp not in known_ids})
+    report["unknown_employees"] = unknown[:MAX_REPORTED_ISSUES]
+    items = sorted((key, value) for key, value in paired.items() if key[0] in known_ids)
+    report["days"] = len(items)
+
+    for start in range(0, len(items), BATCH_SIZE):
+        batch = items[start:start + BATCH_SIZE]
+        # A dry run only reads, so it must not take the write lock
+        with (nullcontext(get_connection()) if dry_run else transaction()) as conn:
+            cursor = conn.cursor()
+            _apply_batch(cursor, batch, report, dry_run)
+            cursor.close()
+            if dry_run:
+                conn.close()
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import punch-clock CSV logs into attendance.")
+    parser.add_argument("csv_file", help="Path to the CSV export")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing them")
+    args = parser.parse_args(argv)
+
+    with open(args.csv_file, newline="", encoding="utf-8-sig") as f:
+        report = import_attendance(f, dry_run=args.dry_run)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, date
+from backend.database import DB_FOLDER, get_connection, transaction
+from backend.services.attendance import refresh_monthly_rollup
+
+# -------------------------
+# WRITE-BEHIND CHECK-IN QUEUE
+# -------------------------
+# Optional fast path for plain (non-override) check-ins and check-outs on
+# today's date. Requests are validated against an in-memory copy of
+# today's attendance, acknowledged at once, and a single writer thread
+# group-commits them to SQLite every few milliseconds.
+#
+# Anything else that writes attendance must run inside synchronous_write(),
+# which flushes the queue first and reloads the in-memory view afterwards.
+#
+# An acknowledged entry that still cannot be written after the retries is
+# never silently dropped: it is appended to DEAD_LETTER_PATH (one JSON
+# object per line) and logged as an error, so an operator can re-enter it.
+
+FLUSH_INTERVAL_SECONDS = 0.005  # how long the writer waits to grow a batch
+MAX_BATCH_SIZE = 500
+MAX_PENDING = 10000
+BUSY_RETRY_SECONDS = 0.05
+BUSY_RETRIES = 20
+ENQUEUE_TIMEOUT_SECONDS = 5
+DEAD_LETTER_PATH = os.path.join(DB_FOLDER, "attendance_dead_letter.jsonl")
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.Queue(maxsize=MAX_PENDING)
+_view_lock = threading.RLock()
+_view = None  # {"date", "records": {employee_id: [check_in, check_out, locked]}, "employees": set}
+_writer = None
+_writer_lock = threading.Lock()
+
+
+class _FlushMarker:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+def _load_view(day):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT employee_id, check_in, check_out, locked
+        FROM attendance WHERE date = ?
+    """, (day,))
+    records = {row[0]: [row[1], row[2], row[3]] for row in cursor.fetchall()}
+    cursor.execute("SELECT employee_id FROM employees")
+    employees = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+    return {"date": day, "records": records, "employees": employees}
+
+
+def _today_view():
+    global _view
+    today = date.today().isoformat()
+    if _view is None or _view["date"] != today:
+        _view = _load_view(today)
+    return _view
+
+
+def _employee_exists(view, employee_id):
+    if employee_id in view["employees"]:
+        return True
+    # Added since the view was loaded
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM employees WHERE employee_id = ?", (employee_id,))
+    found = cursor.fetchone() is not None
+    cursor.close()
+    conn.close()
+    if found:
+        view["employees"].add(employee_id)
+    return found
+
+
+def _ensure_writer():
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_drain, name="attendance-writer", daemon=True)
+            _writer.start()
+
+
+def _record(view, op):
+    kind, employee_id, _, at, _ = op
+    if kind == "in":
+        view["records"][employee_id] = [at, None, 0]
+    else:
+        view["records"][employee_id][1] = at
+
+
+def _enqueue(prepare):
+    """
+    Validates against today's view with prepare(view), which returns the op
+    to queue, and records it in the view once queued. The queue is never
+    waited on while _view_lock is held: when it is full the lock is
+    released and the whole step retried, since the view may have changed.
+    """
+    _ensure_writer()
+    deadline = time.monotonic() + ENQUEUE_TIMEOUT_SECONDS
+    while True:
+        with _view_lock:
+            view = _today_view()
+            op = prepare(view)
+            try:
+                _queue.put_nowait(op)
+            except queue.Full:
+                pass
+            else:
+                _record(view, op)
+                return
+        if time.monotonic() >= deadline:
+            raise Exception("Check-in queue is full, please try again")
+        time.sleep(FLUSH_INTERVAL_SECONDS)
+
+
+def queued_check_in(employee_id):
+    """Same rules as attendance.check_in() for today, without waiting for the write."""
+    employee_id = int(employee_id)
+    now = datetime.now().strftime("%H:%M:%S")
+
+    def prepare(view):
+        if not _employee_exists(view, employee_id):
+            raise Exception("Employee not found")
+        if employee_id in view["records"]:
+            raise Exception("Already checked in for this date")
+        return ("in", employee_id, view["date"], now, None)
+
+    _enqueue(prepare)
+
+
+def queued_check_out(employee_id):
+    """Same rules as attendance.check_out() for today, without waiting for the write."""
+    employee_id = int(employee_id)
+    now = datetime.now().strftime("%H:%M:%S")
+
+    def prepare(view):
+        record = view["records"].get(employee_id)
+        if record is None:
+            raise Exception("No check-in found for this date")
+
+        check_in_time, _, locked = record
+        if locked:
+            raise Exception("Attendance record is locked")
+
+        try:
+            check_in_dt = datetime.strptime(check_in_time, "%H:%M:%S")
+            check_out_dt = datetime.strptime(now, "%H:%M:%S")
+            if check_out_dt < check_in_dt:
+                raise ValueError("Check-out time cannot be before check-in time")
+            worked_hours = (check_out_dt - check_in_dt).seconds / 3600
+        except ValueError as ve:
+            raise Exception(f"Time Calculation Error: {str(ve)}")
+
+        return ("out", employee_id, view["date"], now, worked_hours)
+
+    _enqueue(prepare)
+
+
+def _apply(cursor, ops):
+    # A check-out always follows its check-in in the queue, so applying
+    # all inserts before all updates preserves per-employee order
+    cursor.executemany("""
+        INSERT INTO attendance (employee_id, date, check_in)
+        SELECT ?, ?, ?
+        WHERE NOT EXISTS (SELECT 1 FROM attendance WHERE employee_id = ? AND date = ?)
+    """, [(emp_id, day, at, emp_id, day) for kind, emp_id, day, at, _ in ops if kind == "in"])
+    cursor.executemany("""
+        UPDATE attendance
+        SET check_out = ?, worked_hours = ?
+        WHERE employee_id = ? AND date = ?
+    """, [(at, hours, emp_id, day) for kind, emp_id, day, at, hours in ops if kind == "out"])
+    refresh_monthly_rollup(cursor, {(emp_id, day) for _, emp_id, day, _, _ in ops})
+
+
+def _dead_letter(op, error):
+    kind, employee_id, day, at, worked_hours = op
+    entry = {
+        "kind": kind,
+        "employee_id": employee_id,
+        "date": day,
+        "time": at,
+        "worked_hours": worked_hours,
+        "error": str(error),
+        "failed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    logger.error("Acknowledged check-%s for employee %s on %s %s could not be saved: %s",
+                 kind, employee_id, day, at, error)
+    try:
+        with open(DEAD_LETTER_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        logger.critical("Could not write %s to %s: %s", entry, DEAD_LETTER_PATH, e)
+
+
+def _write_batch(ops):
+    for attempt in range(BUSY_RETRIES + 1):
+        try:
+            with transaction() as conn:
+                cursor = conn.cursor()
+                _apply(cursor, ops)
+                cursor.close()
+            return
+        except sqlite3.OperationalError as e:
+            # Usually the database is busy/locked: the batch was rolled back, try again
+            failure = e
+            logger.warning("Attendance batch of %d deferred: %s", len(ops), e)
+            time.sleep(BUSY_RETRY_SECONDS)
+        except Exception as e:
+            failure = e
+            break
+
+    # Something in the batch is invalid (e.g. the employee was deleted);
+    # keep the rest by writing entries one at a time
+    logger.warning("Attendance batch failed (%s); retrying entries individually", failure)
+    for op in ops:
+        try:
+            with transaction() as conn:
+                cursor = conn.cursor()
+                _apply(cursor, [op])
+                cursor.close()
+        except Exception as op_error:
+            _dead_letter(op, op_error)
+
+
+def _drain():
+    while True:
+        item = _queue.get()
+        ops = []
+        markers = []
+        deadline = time.monotonic() + FLUSH_INTERVAL_SECONDS
+        while True:
+            if isinstance(item, _FlushMarker):
+                markers.append(item)
+            else:
+                ops.append(item)
+            if len(ops) >= MAX_BATCH_SIZE:
+                break
+            try:
+                remaining = 0 if markers else max(0, deadline - time.monotonic())
+                item = _queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+
+        if ops:
+            _write_batch(ops)
+        for marker in markers:
+            marker.done.set()
+
+
+def flush_attendance_queue(timeout=10.0):
+    """
+    Blocks until every check-in acknowledged before the call is committed.
+    Returns False if that did not happen within `timeout` seconds.
+    """
+    if _writer is None or not _writer.is_alive():
+        return _queue.empty()
+    marker = _FlushMarker()
+    try:
+        _queue.put(marker, timeout=timeout)
+    except queue.Full:
+        return False
+    return marker.done.wait(timeout)
+
+
+@contextmanager
+def synchronous_write():
+    """
+    Wraps attendance writes that bypass the queue (overrides, bulk actions,
+    imports, deletions): queued entries are committed first, new queued
+    check-ins wait until the write is done, and the view is then reloaded.
+    """
+    global _view
+    with _view_lock:
+        flush_attendance_queue()
+        try:
+            yield
+        finally:
+            _view = None
+
+
+# Acknowledged check-ins must reach the database even on a plain interpreter exit
+atexit.register(flush_attendance_queue)
@@ -0,0 +1,119 @@
+import queue
+import threading
+from datetime import datetime
+from backend.database import get_connection
+
+# -------------------------
+# AUDIT LOG WRITER
+# -------------------------
+# Services call record_audit(), which only puts the entry on a bounded
+# queue. A single background thread drains the queue and writes entries
+# to audit_logs in batches, so auditing never adds a write to the request.
+
+AUDIT_QUEUE_SIZE = 10000
+AUDIT_BATCH_SIZE = 200
+AUDIT_LINGER_SECONDS = 0.5
+
+_queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+_writer_lock = threading.Lock()
+_writer = None
+_actor = threading.local()
+_dropped = 0
+
+
+class _FlushMarker:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+def set_audit_actor(user_id):
+    """Sets the user the current thread's audit entries are attributed to."""
+    try:
+        _actor.user_id = int(user_id) if user_id not in (None, "") else None
+    except (TypeError, ValueError):
+        _actor.user_id = None
+
+
+def _ensure_writer():
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_drain, name="audit-writer", daemon=True)
+            _writer.start()
+
+
+def record_audit(action, entity=None, reason=None, user_id=None):
+    """
+    Queues an audit entry without blocking. If the queue is full the
+    entry is dropped and counted rather than stalling the caller.
+    """
+    global _dropped
+    if user_id is None:
+        user_id = getattr(_actor, "user_id", None)
+    entry = (user_id, action, entity, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), reason)
+
+    _ensure_writer()
+    try:
+        _queue.put_nowait(entry)
+    except queue.Full:
+        _dropped += 1
+        print(f"Warning: audit queue full, dropped entry ({_dropped} total): {action} {entity}")
+
+
+def _write_batch(batch):
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        # Unknown user IDs are stored as NULL rather than failing the batch
+        cursor.executemany("""
+            INSERT INTO audit_logs (user_id, action, entity, timestamp, reason)
+            SELECT (SELECT user_id FROM users WHERE user_id = ?), ?, ?, ?, ?
+        """, batch)
+        conn.commit()
+    except Exception as e:
+        print(f"Warning: failed to write {len(batch)} audit entries: {e}")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _drain():
+    while True:
+        item = _queue.get()
+        batch = []
+        markers = []
+
+        # Collect whatever arrives shortly after the first entry
+        while True:
+            if isinstance(item, _FlushMarker):
+                markers.append(item)
+            else:
+                batch.append(item)
+            if len(batch) >= AUDIT_BATCH_SIZE:
+                break
+            try:
+                item = _queue.get(timeout=0 if markers else AUDIT_LINGER_SECONDS)
+            except queue.Empty:
+                break
+
+        if batch:
+            _write_batch(batch)
+        for marker in markers:
+            marker.done.set()
+
+
+def flush_audit_log(timeout=5.0):
+    """
+    Blocks until every entry queued before the call has been written.
+    Returns False if that did not happen within `timeout` seconds.
+    """
+    if _writer is None or not _writer.is_alive():
+        return _queue.empty()
+    marker = _FlushMarker()
+    try:
+        _queue.put(marker, timeout=timeout)
+    except queue.Full:
+        return False
+    return marker.done.wait(timeout)
@@ -0,0 +1,477 @@
+import argparse
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import uuid
+from datetime import datetime
+from backend.database import DB_PATH, CHANGE_LOG_TABLES, ROLLUP_REBUILD_SQL, open_connection
+from backend.services.settings import invalidate_settings_cache
+
+# ---------------------------------------------------------
+# PATH LOGIC FOR PYINSTALLER
+# ---------------------------------------------------------
+if getattr(sys, 'frozen', False):
+    # Exe Directory
+    BASE_DIR = os.path.dirname(sys.executable)
+else:
+    # Dev Directory (Assuming services/backup.py -> go up 2 levels)
+    BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+BACKUP_DIR = os.path.join(BASE_DIR, 'BACKUPS')
+BACKUP_PREFIX = "attendance_backup_"
+
+# Number of full backups kept in BACKUPS; older ones are deleted
+BACKUP_RETENTION = 10
+
+# --- ONLINE BACKUP ---
+def _timestamp():
+    return datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+def _compress_file(path):
+    compressed_path = path + ".gz"
+    with open(path, "rb") as src, gzip.open(compressed_path, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.remove(path)
+    return compressed_path
+
+def rotate_backups(retention=BACKUP_RETENTION):
+    """Deletes the oldest full backups so at most `retention` remain."""
+    backups = _full_backups()
+    removed = backups[:-retention] if retention > 0 else backups
+    for name in removed:
+        os.remove(os.path.join(BACKUP_DIR, name))
+
+        sidecar = os.path.join(BACKUP_DIR, name + ".json")
+        if os.path.exists(sidecar):
+            os.remove(sidecar)
+
+    # Change segments older than the oldest kept full backup can't be replayed
+    kept = backups[len(removed):]
+    if removed and kept:
+        meta = _read_sidecar(kept[0])
+        if meta:
+            _prune_segments(meta["snapshot_seq"])
+    return removed
+
+def create_database_backup(compress=False, progress=None):
+    """
+    Creates a consistent, timestamped copy of the live database in BACKUPS
+    using the SQLite online backup API, so writes may continue meanwhile.
+    `progress(pages_done, pages_total)` is called before and after the copy.
+    Returns the backup filename.
+    """
+    if not os.path.exists(DB_PATH):
+        raise FileNotFoundError(f"Live database file not found at {DB_PATH}")
+
+    # Ensure Backup Directory Exists
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+
+    # Move pending changes into a segment first, so the live change_log stays
+    # small and every change remains replayable from some backup
+    create_incremental_backup()
+
+    # Create filename: attendance_backup_YYYY-MM-DD_HH-MM-SS.db
+    backup_filename = f"{BACKUP_PREFIX}{_timestamp()}.db"
+    backup_path = os.path.join(BACKUP_DIR, backup_filename)
+    partial_path = backup_path + ".partial"
+
+    def on_step(status, remaining, total):
+        if progress:
+            progress(total - remaining, total)
+
+    source = open_connection()
+    target = sqlite3.connect(partial_path)
+    try:
+        if progress:
+            progress(0, source.execute("PRAGMA page_count").fetchone()[0])
+        # One pass: in WAL mode it only holds a read snapshot, so writers are
+        # not blocked. A stepped backup restarts from page 0 whenever another
+        # connection writes, and may never finish on a busy database.
+        source.backup(target, progress=on_step)
+        # Backups are standalone files: leave them in rollback-journal mode
+        target.execute("PRAGMA journal_mode = DELETE;")
+        snapshot_meta = _write_snapshot_meta(target)
+    except Exception:
+        target.close()
+        os.remove(partial_path)
+        raise
+    finally:
+        source.close()
+    target.close()
+    os.replace(partial_path, backup_path)
+
+    if compress:
+        backup_path = _compress_file(backup_path)
+        backup_filename = os.path.basename(backup_path)
+
+    # Small sidecar so rotation need not open (or decompress) the backup
+    with open(backup_path + ".json", "w") as f:
+        json.dump(snapshot_meta, f)
+
+    rotate_backups()
+    return backup_filename
+
+# --- INCREMENTAL BACKUP (CHANGE LOG) ---
+# Every row change is captured by triggers into change_log (see database.py).
+# An incremental backup moves the rows captured since the previous one into a
+# compressed JSON-lines segment in BACKUPS/incremental, named
+# changes_<first seq>_<last seq>.jsonl.gz. A full backup records the change_log
+# position it contains, so a restore is: newest full backup taken before the
+# target time + every later change up to that time.
+INCREMENTAL_DIR = os.path.join(BACKUP_DIR, 'incremental')
+SEGMENT_PREFIX = "changes_"
+SEGMENT_FETCH_BATCH = 5000
+
+def _change_log_position(conn):
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return row[0] if row else 0
+
+def _write_snapshot_meta(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS backup_meta(
+            snapshot_seq INTEGER NOT NULL,
+            snapshot_at TEXT NOT NULL
+        )
+    """)
+    meta = {
+        "snapshot_seq": _change_log_position(conn),
+        "snapshot_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    }
+    conn.execute("DELETE FROM backup_meta")
+    conn.execute(
+        "INSERT INTO backup_meta (snapshot_seq, snapshot_at) VALUES (?, ?)",
+        (meta["snapshot_seq"], meta["snapshot_at"])
+    )
+    conn.commit()
+    return meta
+
+def _read_sidecar(name):
+    try:
+        with open(os.path.join(BACKUP_DIR, name + ".json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _segment_range(name):
+    first, last = name[len(SEGMENT_PREFIX):].split(".")[0].split("_")
+    return int(first), int(last)
+
+def _list_segments():
+    if not os.path.isdir(INCREMENTAL_DIR):
+        return []
+    names = [n for n in os.listdir(INCREMENTAL_DIR)
+             if n.startswith(SEGMENT_PREFIX) and n.endswith(".jsonl.gz")]
+    return sorted(names, key=_segment_range)
+
+def create_incremental_backup():
+    """
+    Writes the changes captured since the last incremental backup to a new
+    segment and removes them from the live change_log.
+    Returns the segment filename, or None when nothing has changed.
+    """
+    os.makedirs(INCREMENTAL_DIR, exist_ok=True)
+    conn = open_connection()
+    try:
+        upper = conn.execute("SELECT MAX(seq) FROM change_log").fetchone()[0]
+        if upper is None:
+            return None
+        lower = conn.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+
+        segment_name = f"{SEGMENT_PREFIX}{lower:012d}_{upper:012d}.jsonl.gz"
+        segment_path = os.path.join(INCREMENTAL_DIR, segment_name)
+        partial_path = segment_path + ".partial"
+
+        cursor = conn.execute("""
+            SELECT seq, ts, tbl, op, row_id, row_data
+            FROM change_log
+            WHERE seq <= ?
+            ORDER BY seq
+        """, (upper,))
+        with gzip.open(partial_path, "wt", encoding="utf-8") as out:
+            while True:
+                batch = cursor.fetchmany(SEGMENT_FETCH_BATCH)
+                if not batch:
+                    break
+                for seq, ts, tbl, op, row_id, row_data in batch:
+                    out.write(json.dumps({"seq": seq, "ts": ts, "tbl": tbl, "op": op,
+                                          "row_id": row_id, "row_data": row_data}) + "\n")
+        os.replace(partial_path, segment_path)
+
+        # Only rows now safely on disk are dropped from the live log
+        conn.execute("DELETE FROM change_log WHERE seq <= ?", (upper,))
+        conn.commit()
+        return segment_name
+    finally:
+        conn.close()
+
+def _prune_segments(oldest_base_seq):
+    """Deletes segments fully covered by the oldest retained full backup."""
+    for name in _list_segments():
+        if _segment_range(name)[1] <= oldest_base_seq:
+            os.remove(os.path.join(INCREMENTAL_DIR, name))
+
+# --- POINT-IN-TIME RESTORE ---
+def _full_backup_time(name):
+    stamp = name[len(BACKUP_PREFIX):].split(".")[0]
+    return datetime.strptime(stamp, "%Y-%m-%d_%H-%M-%S")
+
+def _full_backups():
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(BACKUP_DIR)
+        if name.startswith(BACKUP_PREFIX) and (name.endswith(".db") or name.endswith(".db.gz"))
+    )
+
+def _extract_backup(name, dest_path):
+    src_path = os.path.join(BACKUP_DIR, name)
+    opener = gzip.open if name.endswith(".gz") else open
+    with opener(src_path, "rb") as src, open(dest_path, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+def _read_snapshot_meta(conn):
+    try:
+        return conn.execute("SELECT snapshot_seq, snapshot_at FROM backup_meta").fetchone()
+    except sqlite3.OperationalError:
+        return None
+
+def _iter_changes_after(seq):
+    """Yields logged changes with seq greater than `seq`, oldest first."""
+    for name in _list_segments():
+        first, last = _segment_range(name)
+        if last <= seq:
+            continue
+        with gzip.open(os.path.join(INCREMENTAL_DIR, name), "rt", encoding="utf-8") as f:
+            for line in f:
+                change = json.loads(line)
+                if change["seq"] > seq:
+                    yield change
+                    seq = change["seq"]
+
+    # Changes not yet moved into a segment are still in the live log
+    conn = open_connection()
+    try:
+        cursor = conn.execute("""
+            SELECT seq, ts, tbl, op, row_id, row_data
+            FROM change_log WHERE seq > ? ORDER BY seq
+        """, (seq,))
+        for row in cursor:
+            yield dict(zip(("seq", "ts", "tbl", "op", "row_id", "row_data"), row))
+    finally:
+        conn.close()
+
+def _apply_change(conn, change):
+    table = change["tbl"]
+    if table not in CHANGE_LOG_TABLES:
+        raise ValueError(f"Unexpected table in change log: {table}")
+    if change["op"] == "D":
+        conn.execute(f"DELETE FROM {table} WHERE rowid = ?", (change["row_id"],))
+        return
+
+    row = json.loads(change["row_data"])
+    new_rowid = row.pop("rowid")
+    if change["op"] == "U" and change["row_id"] != new_rowid:
+        # Primary key changed (e.g. user renumbering): drop the old row first
+        conn.execute(f"DELETE FROM {table} WHERE rowid = ?", (change["row_id"],))
+    columns = ", ".join(["rowid", *row])
+    placeholders = ", ".join("?" * (len(row) + 1))
+    conn.execute(
+        f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})",
+        (new_rowid, *row.values())
+    )
+
+def restore_to_point_in_time(target_time, output_path=None, replace_live=False):
+    """
+    Rebuilds the database as it was at `target_time` (YYYY-MM-DD HH:MM[:SS]).
+    Starts from the newest full backup whose snapshot predates target_time,
+    replays the change log up to that moment and verifies integrity_check.
+    The result is written to output_path (default: BACKUPS/restored_<time>.db);
+    with replace_live=True it is also copied over the live database.
+    Returns a summary dict.
+    """
+    target = datetime.fromisoformat(target_time)
+    target_str = target.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    if output_path is None:
+        output_path = os.path.join(BACKUP_DIR, f"restored_{target.strftime('%Y-%m-%d_%H-%M-%S')}.db")
+
+    # Newest candidate first; a backup named before target may still have
+    # finished after it, so the recorded snapshot time decides
+    base_name = None
+    conn = None
+    for name in reversed(_full_backups()):
+        if _full_backup_time(name) > target:
+            continue
+        _extract_backup(name, output_path)
+        conn = sqlite3.connect(output_path)
+        meta = _read_snapshot_meta(conn)
+        if meta and meta[1] <= target_str:
+            base_name = name
+            break
+        conn.close()
+        conn = None
+    if base_name is None:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise ValueError("No full backup with change tracking exists before that time")
+
+    base_seq = meta[0]
+    applied = 0
+    try:
+        conn.execute("PRAGMA foreign_keys = OFF;")
+        for change in _iter_changes_after(base_seq):
+            if change["ts"] > target_str:
+                break
+            _apply_change(conn, change)
+            applied += 1
+        conn.execute("DROP TABLE IF EXISTS backup_meta")
+
+        # Derived tables are not logged; recompute them from the restored rows
+        conn.execute("DELETE FROM attendance_monthly")
+        conn.execute(ROLLUP_REBUILD_SQL)
+
+        # The replay was re-logged by the triggers; history up to here already
+        # lives in the backups, and new sequence numbers must not reuse those
+        live = open_connection()
+        try:
+            live_position = _change_log_position(live)
+        finally:
+            live.close()
+        conn.execute("DELETE FROM change_log")
+        conn.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'change_log'",
+            (live_position,)
+        )
+        conn.commit()
+
+        integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        if integrity != "ok":
+            raise RuntimeError(f"Restored database failed integrity_check: {integrity}")
+
+        if replace_live:
+            live = open_connection()
+            try:
+                conn.backup(live)
+            finally:
+                live.close()
+    finally:
+        conn.close()
+
+    if replace_live:
+        # The restored settings_generation may equal the cached one
+        invalidate_settings_cache()
+        # Start a fresh base so later restores never mix the abandoned timeline in
+        create_database_backup()
+
+    return {
+        "base_backup": base_name,
+        "changes_applied": applied,
+        "restored_to": target_str,
+        "output_path": output_path,
+        "replaced_live": replace_live
+    }
+
+# --- BACKGROUND JOBS ---
+_jobs_lock = threading.Lock()
+_jobs = {}
+_active_job_id = None
+
+# Finished jobs kept for status lookups
+MAX_TRACKED_JOBS = 20
+
+def _run_backup_job(job_id, compress, mode):
+    global _active_job_id
+    job = _jobs[job_id]
+
+    def on_progress(done, total):
+        job["pages_done"] = done
+        job["pages_total"] = total
+
+    job["state"] = "running"
+    try:
+        if mode == "incremental":
+            job["filename"] = create_incremental_backup()
+        else:
+            job["filename"] = create_database_backup(compress=compress, progress=on_progress)
+        job["state"] = "done"
+    except Exception as e:
+        print(f"Backup failed: {e}")
+        job["state"] = "failed"
+        job["error"] = str(e)
+    finally:
+        job["finished_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with _jobs_lock:
+            _active_job_id = None
+
+def start_backup_job(compress=False, mode="full"):
+    """
+    Starts a backup ("full" or "incremental") on a background thread and
+    returns its job dict.
+    Only one backup runs at a time; if one is already running it is returned.
+    """
+    global _active_job_id
+    if mode not in ("full", "incremental"):
+        raise ValueError("Backup mode must be 'full' or 'incremental'")
+    with _jobs_lock:
+        if _active_job_id is not None:
+            return dict(_jobs[_active_job_id])
+
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "job_id": job_id,
+            "state": "queued",
+            "mode": mode,
+            "compress": bool(compress),
+            "filename": None,
+            "error": None,
+            "pages_done": 0,
+            "pages_total": None,
+            "started_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "finished_at": None
+        }
+        _jobs[job_id] = job
+        _active_job_id = job_id
+
+        # Forget the oldest finished jobs
+        while len(_jobs) > MAX_TRACKED_JOBS:
+            oldest = next(iter(_jobs))
+            if oldest == job_id:
+                break
+            del _jobs[oldest]
+
+    threading.Thread(target=_run_backup_job, args=(job_id, compress, mode), daemon=True).start()
+    return dict(job)
+
+def get_backup_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Database backup and point-in-time restore.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    full = sub.add_parser("full", help="Take a full online backup")
+    full.add_argument("--compress", action="store_true")
+    sub.add_parser("incremental", help="Save changes since the last incremental backup")
+    restore = sub.add_parser("restore", help="Rebuild the database as of a point in time")
+    restore.add_argument("--to", required=True, help="Target time, YYYY-MM-DD HH:MM[:SS]")
+    restore.add_argument("--output", help="Where to write the restored database")
+    restore.add_argument("--replace-live", action="store_true",
+                         help="Also overwrite the live database with the result")
+    args = parser.parse_args(argv)
+
+    if args.command == "full":
+        print(create_database_backup(compress=args.compress))
+    elif args.command == "incremental":
+        print(create_incremental_backup() or "No changes since the last incremental backup")
+    else:
+        print(json.dumps(restore_to_point_in_time(args.to, args.output, args.replace_live), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,96 @@
+import hashlib
+import mimetypes
 import os
+import threading
+import uuid
 from datetime import datetime
-from backend.database import   get_connection
+from backend.database import BASE_DIR, get_connection, transaction
 
 UPLOAD_FOLDER = "UPLOADS"
 
+# ---------------------------------------------------------
+# CONTENT-ADDRESSED BLOB STORE
+# ---------------------------------------------------------
+# Uploaded files are stored once per distinct content under
+# UPLOADS/blobs/<first 2 hex chars>/<sha256>. Every employee_docs row that
+# points at a blob counts as one reference (looked up through the
+# content_hash index); the file is removed when the last one goes.
+BLOB_FOLDER = os.path.join(UPLOAD_FOLDER, "blobs")
+CHUNK_SIZE = 1024 * 1024
+
+# Serialises "blob exists?" / "last reference gone?" decisions so an upload
+# can never attach to a blob that a concurrent delete is removing
+_blob_lock = threading.Lock()
+
+
+def _blob_relative_path(content_hash):
+    return os.path.join(BLOB_FOLDER, content_hash[:2], content_hash)
+
+
+def _spool_upload(stream):
+    """
+    Copies `stream` to a temp file in chunks while hashing it. Runs without
+    _blob_lock, so a slow upload does not hold up other uploads or deletes.
+    Returns (tmp_path, content_hash, size_bytes).
+    """
+    tmp_dir = os.path.join(BASE_DIR, BLOB_FOLDER, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), size
+
+
+def _store_blob(tmp_path, content_hash):
+    """
+    Moves a spooled upload into the blob store, or drops it if the same
+    content is already stored. Returns (relative_path, mtime). Must be
+    called with _blob_lock held so the blob cannot be reclaimed before it
+    is referenced.
+    """
+    rel_path = _blob_relative_path(content_hash)
+    abs_path = os.path.join(BASE_DIR, rel_path)
+    if os.path.exists(abs_path):
+        # Same content already stored: keep the existing blob
+        os.remove(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+        os.replace(tmp_path, abs_path)
+    return rel_path, os.stat(abs_path).st_mtime
+
+
+def _remove_if_unreferenced(cursor, content_hash):
+    cursor.execute("SELECT COUNT(*) FROM employee_docs WHERE content_hash = ?", (content_hash,))
+    if cursor.fetchone()[0] == 0:
+        abs_path = os.path.join(BASE_DIR, _blob_relative_path(content_hash))
+        if os.path.exists(abs_path):
+            os.remove(abs_path)
+
+
+def reclaim_unreferenced_blobs(content_hashes):
+    """Deletes the blobs in `content_hashes` that no document refers to any more."""
+    with _blob_lock:
+        conn = get_connection()
+        cursor = conn.cursor()
+        for content_hash in set(content_hashes):
+            if content_hash:
+                _remove_if_unreferenced(cursor, content_hash)
+        cursor.close()
+        conn.close()
+
 
 def get_documents_by_employee(employee_id):
     conn = get_connection()
@@ -11,7 +98,8 @@ def get_documents_by_employee(employee_id):
 
     # UPDATED: Added doc_id to the selection
     cursor.execute("""
-        SELECT doc_id, doc_type, adhaar_no, file_path, upload_at 
+        SELECT doc_id, doc_type, adhaar_no, file_path, upload_at, original_name,
+               size_bytes, mime_type
         FROM employee_docs 
         WHERE employee_id = ?
     """, (employee_id,))
@@ -32,25 +120,116 @@ def get_document_by_id(doc_id):
     conn.close()
     return row
 
-def delete_document_record(doc_id):
+def _file_info(row):
+    file_path, content_hash, original_name, size_bytes, mime_type, file_mtime = row
+    return {
+        "abs_path": os.path.join(BASE_DIR, file_path),
+        "content_hash": content_hash,
+        "original_name": original_name or os.path.basename(file_path),
+        "size_bytes": size_bytes,
+        "mime_type": mime_type,
+        "mtime": file_mtime
+    }
+
+def get_document_file(doc_id):
+    """Returns the stored serving metadata for a document, or None."""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("DELETE FROM employee_docs WHERE doc_id = ?", (doc_id,))
-    conn.commit()
+    cursor.execute("""
+        SELECT file_path, content_hash, original_name, size_bytes, mime_type, file_mtime
+        FROM employee_docs WHERE doc_id = ?
+    """, (doc_id,))
+    row = cursor.fetchone()
     cursor.close()
     conn.close()
+    return _file_info(row) if row and row[0] else None
+
+def get_blob_file(content_hash):
+    """Returns serving metadata for a blob via any document that references it."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT file_path, content_hash, original_name, size_bytes, mime_type, file_mtime
+        FROM employee_docs WHERE content_hash = ? LIMIT 1
+    """, (content_hash,))
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return _file_info(row) if row else None
+
+def delete_document_record(doc_id):
+    """
+    Deletes a document row. The stored file is removed once no other
+    document references the same content (legacy per-employee files are
+    removed directly).
+    """
+    with _blob_lock:
+        with transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT file_path, content_hash FROM employee_docs WHERE doc_id = ?", (doc_id,))
+            row = cursor.fetchone()
+            if not row:
+                cursor.close()
+                return
+            file_path, content_hash = row
+            cursor.execute("DELETE FROM employee_docs WHERE doc_id = ?", (doc_id,))
+            cursor.close()
+
+        # Files are only touched once the row deletion has committed
+        if content_hash:
+            conn = get_connection()
+            cursor = conn.cursor()
+            _remove_if_unreferenced(cursor, content_hash)
+            cursor.close()
+            conn.close()
+        elif file_path:
+            try:
+                abs_path = os.path.join(BASE_DIR, file_path)
+                if os.path.exists(abs_path):
+                    os.remove(abs_path)
+            except OSError as e:
+                print(f"Error deleting file: {e}")
     
-def add_document(employee_id, doc_type, adhaar_no, file_path):
+def add_document(employee_id, doc_type, adhaar_no, file_path, content_hash=None,
+                 original_name=None, size_bytes=None, mime_type=None, file_mtime=None):
     conn = get_connection()
     cursor = conn.cursor()
 
     upload_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     cursor.execute("""
-        INSERT INTO employee_docs (employee_id, adhaar_no, doc_type, file_path, upload_at)
-        VALUES (?, ?, ?, ?, ?)
-    """, (employee_id, adhaar_no, doc_type, file_path, upload_time))
+        INSERT INTO employee_docs (employee_id, adhaar_no, doc_type, file_path, upload_at,
+                                   content_hash, original_name, size_bytes, mime_type, file_mtime)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (employee_id, adhaar_no, doc_type, file_path, upload_time,
+          content_hash, original_name, size_bytes, mime_type, file_mtime))
 
     conn.commit()
     cursor.close()
-    conn.close()
\ No newline at end of file
+    conn.close()
+
+def store_document(employee_id, doc_type, adhaar_no, stream, original_name, mime_type=None):
+    """
+    Streams an uploaded file into the blob store and records the document.
+    Identical content uploaded again (for any employee) reuses the stored blob.
+    """
+    if not mime_type or mime_type == "application/octet-stream":
+        mime_type = mimetypes.guess_type(original_name)[0] or "application/octet-stream"
+
+    tmp_path, content_hash, size = _spool_upload(stream)
+    with _blob_lock:
+        rel_path, mtime = _store_blob(tmp_path, content_hash)
+        try:
+            add_document(employee_id, doc_type, adhaar_no, rel_path, content_hash=content_hash,
+                         original_name=original_name, size_bytes=size, mime_type=mime_type,
+                         file_mtime=mtime)
+        except Exception:
+            # e.g. the employee was deleted meanwhile: a new blob with no
+            # document row would never be reclaimed, so remove it now
+            conn = get_connection()
+            cursor = conn.cursor()
+            _remove_if_unreferenced(cursor, content_hash)
+            cursor.close()
+            conn.close()
+            raise
+    return content_hash
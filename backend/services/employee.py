@@ -1,43 +1,56 @@
-from datetime import date
+from datetime import date, datetime
 import calendar
 from backend.database import get_connection
+from backend.services.settings import get_daily_required_hours
+from backend.services.documents import reclaim_unreferenced_blobs
+from backend.services.audit import record_audit
+from backend.utils.pagination import encode_cursor, decode_cursor
 
-def get_daily_required_hours():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT setting_value FROM system_settings WHERE setting_key = 'daily_hours'")
-    row = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    return float(row[0]) if row else 16.0
-
-def calculate_hourly_rate(monthly_salary):
+def _rate_divisor(required_hours=None):
     today = date.today()
     days_in_month = calendar.monthrange(today.year, today.month)[1]
-    
-    # Fetch dynamic hours from DB
-    required_hours = get_daily_required_hours()
-    
+
+    # Fetch dynamic hours from DB unless the caller already has them
+    if required_hours is None:
+        required_hours = get_daily_required_hours()
+    return days_in_month * required_hours
+
+def calculate_hourly_rate(monthly_salary):
+    divisor = _rate_divisor()
     # Prevent division by zero
-    divisor = days_in_month * required_hours
     if divisor == 0: return 0
     return round(monthly_salary / divisor, 2)
 
 # NEW: Helper to refresh everyone's rate when settings change
-def recalculate_all_employee_rates():
+def recalculate_all_employee_rates(required_hours=None, snapshot=False):
+    """
+    Recomputes every employee's hourly_rate with one UPDATE, using a divisor
+    computed once for the current month. Runs inside the caller's
+    transaction() when there is one. With snapshot=True the resulting rates
+    are also recorded in employee_rate_snapshots for the current month, and
+    payroll for that month keeps using these hours once the month has ended.
+    """
+    divisor = _rate_divisor(required_hours)
+
     conn = get_connection()
     cursor = conn.cursor()
-    
-    cursor.execute("SELECT employee_id, monthly_salary FROM employees")
-    employees = cursor.fetchall()
-    
-    for emp in employees:
-        emp_id = emp[0]
-        salary = emp[1]
-        new_rate = calculate_hourly_rate(salary)
-        
-        cursor.execute("UPDATE employees SET hourly_rate = ? WHERE employee_id = ?", (new_rate, emp_id))
-        
+
+    # Prevent division by zero
+    if divisor == 0:
+        cursor.execute("UPDATE employees SET hourly_rate = 0")
+    else:
+        cursor.execute("UPDATE employees SET hourly_rate = ROUND(monthly_salary / ?, 2)", (divisor,))
+
+    if snapshot:
+        month = date.today().strftime("%Y-%m")
+        daily_hours = required_hours if required_hours is not None else get_daily_required_hours()
+        cursor.execute("""
+            INSERT OR REPLACE INTO employee_rate_snapshots
+                (employee_id, month, hourly_rate, daily_hours, recorded_at)
+            SELECT employee_id, ?, hourly_rate, ?, ?
+            FROM employees
+        """, (month, daily_hours, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
     conn.commit()
     cursor.close()
     conn.close()
@@ -61,17 +74,96 @@ def add_employee(name, role, phone, address, monthly_salary):
     cursor.close()
     conn.close()
 
-def get_all_employees():
+# API field name -> column, in the order fields are returned
+EMPLOYEE_FIELDS = {
+    "id": "employee_id",
+    "name": "name",
+    "role": "role",
+    "phone": "phone",
+    "address": "address",
+    "monthly_salary": "monthly_salary",
+    "status": "status",
+}
+
+# Sort key -> SQL expression (COALESCE keeps keyset comparisons NULL-safe)
+EMPLOYEE_SORT_KEYS = {
+    "id": "employee_id",
+    "name": "name",
+    "role": "COALESCE(role, '')",
+    "monthly_salary": "monthly_salary",
+    "status": "COALESCE(status, '')",
+}
+
+MAX_PAGE_SIZE = 500
+
+
+def get_all_employees(status=None, role=None, sort="id", order="asc", limit=None, cursor=None, fields=None):
+    """
+    Lists employees with filtering, sorting, keyset pagination and field
+    projection done in SQL.
+    Returns a dict: {"employees": [dict, ...], "total": int, "next_cursor": str|None}.
+    `total` counts every row matching the filters, not just this page.
+    """
+    fields = list(fields) if fields else list(EMPLOYEE_FIELDS)
+    unknown = [f for f in fields if f not in EMPLOYEE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    if sort not in EMPLOYEE_SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort}")
+    if order not in ("asc", "desc"):
+        raise ValueError("Order must be 'asc' or 'desc'")
+    if limit is not None:
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    where = []
+    params = []
+    if status:
+        where.append("status = ?")
+        params.append(status)
+    if role:
+        where.append("role = ?")
+        params.append(role)
+
     conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT employee_id, name, role, phone, address, monthly_salary, status
+    db_cursor = conn.cursor()
+
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    db_cursor.execute(f"SELECT COUNT(*) FROM employees {where_sql}", params)
+    total = db_cursor.fetchone()[0]
+
+    sort_expr = EMPLOYEE_SORT_KEYS[sort]
+    if cursor:
+        comparison = ">" if order == "asc" else "<"
+        where.append(f"({sort_expr}, employee_id) {comparison} (?, ?)")
+        sort_value, last_id = decode_cursor(cursor, 2)
+        params.extend([sort_value, last_id])
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+    columns = ", ".join(EMPLOYEE_FIELDS[f] for f in fields)
+    direction = order.upper()
+    sql = f"""
+        SELECT {columns}, {sort_expr}, employee_id
         FROM employees
-    """)
-    rows = cursor.fetchall()
-    cursor.close()
+        {where_sql}
+        ORDER BY {sort_expr} {direction}, employee_id {direction}
+    """
+    if limit is not None:
+        # Fetch one extra row to know whether another page exists
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+
+    db_cursor.execute(sql, params)
+    rows = db_cursor.fetchall()
+    db_cursor.close()
     conn.close()
-    return rows
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
+
+    employees = [dict(zip(fields, row)) for row in rows]
+    return {"employees": employees, "total": total, "next_cursor": next_cursor}
 
 def get_employee_by_id(employee_id):
     conn = get_connection()
@@ -110,12 +202,25 @@ def deactivate_employee(employee_id):
 def delete_employee(employee_id):
     conn = get_connection()
     cursor = conn.cursor()
+
+    cursor.execute("SELECT name, role FROM employees WHERE employee_id = ?", (employee_id,))
+    employee = cursor.fetchone()
+
+    # Remember which stored files this employee's documents used
+    cursor.execute("SELECT content_hash FROM employee_docs WHERE employee_id = ?", (employee_id,))
+    content_hashes = [row[0] for row in cursor.fetchall()]
     
     cursor.execute("DELETE FROM attendance WHERE employee_id = ?", (employee_id,))
+    cursor.execute("DELETE FROM attendance_monthly WHERE employee_id = ?", (employee_id,))
+    cursor.execute("DELETE FROM employee_rate_snapshots WHERE employee_id = ?", (employee_id,))
     cursor.execute("DELETE FROM salary_cal WHERE employee_id = ?", (employee_id,))
     cursor.execute("DELETE FROM employee_docs WHERE employee_id = ?", (employee_id,))
     cursor.execute("DELETE FROM employees WHERE employee_id = ?", (employee_id,))
     
     conn.commit()
     cursor.close()
-    conn.close()
\ No newline at end of file
+    conn.close()
+
+    reclaim_unreferenced_blobs(content_hashes)
+    if employee:
+        record_audit("employee_delete", f"employee:{employee_id}", f"{employee[0]} ({employee[1]})")
\ No newline at end of file
@@ -0,0 +1,223 @@
+import threading
+import time
+from datetime import date, timedelta
+from backend.database import get_connection
+from backend.utils.dates import month_date_range
+
+# Wider ranges produce sheets too wide to be useful as a register
+MAX_REGISTER_DAYS = 93
+FETCH_BATCH = 500
+
+
+def _iter_cursor(cursor):
+    while True:
+        batch = cursor.fetchmany(FETCH_BATCH)
+        if not batch:
+            return
+        yield from batch
+
+
+def resolve_register_range(month=None, date_from=None, date_to=None):
+    """
+    Returns the inclusive (date_from, date_to) ISO range for an export,
+    taken either from a whole month (YYYY-MM) or explicit dates.
+    """
+    if month:
+        start, next_month = month_date_range(month)
+        end = (date.fromisoformat(next_month) - timedelta(days=1)).isoformat()
+        return start, end
+    if not date_from or not date_to:
+        raise ValueError("Provide a month or both from and to dates")
+    if date.fromisoformat(date_from) > date.fromisoformat(date_to):
+        raise ValueError("From date must not be after to date")
+    return date_from, date_to
+
+
+def iter_attendance_register(date_from, date_to):
+    """
+    Yields the attendance register as rows: a header, then one row per
+    employee with worked hours for each day ("P" when checked in without a
+    check-out, blank when absent) and the total for the range.
+    Active employees are always listed; inactive ones only if they have
+    attendance in the range.
+    """
+    start = date.fromisoformat(date_from)
+    end = date.fromisoformat(date_to)
+    day_count = (end - start).days + 1
+    if day_count > MAX_REGISTER_DAYS:
+        raise ValueError(f"Attendance register is limited to {MAX_REGISTER_DAYS} days")
+    days = [(start + timedelta(days=i)).isoformat() for i in range(day_count)]
+    day_index = {d: i for i, d in enumerate(days)}
+
+    # Validation happens above so errors surface before streaming starts
+    def generate():
+        yield ["Employee ID", "Name", "Role", *days, "Total Hours"]
+
+        conn = get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT e.employee_id, e.name, e.role, a.date, a.check_in, a.worked_hours
+                FROM employees e
+                LEFT JOIN attendance a
+                       ON a.employee_id = e.employee_id
+                      AND a.date >= ? AND a.date <= ?
+                WHERE e.status = 'active' OR a.attendance_id IS NOT NULL
+                ORDER BY e.employee_id, a.date
+            """, (date_from, date_to))
+
+            current_id = None
+            row = None
+            total = 0.0
+            for employee_id, name, role, day, check_in_time, worked_hours in _iter_cursor(cursor):
+                if employee_id != current_id:
+                    if row is not None:
+                        yield [*row, round(total, 2)]
+                    current_id = employee_id
+                    row = [employee_id, name, role, *([None] * day_count)]
+                    total = 0.0
+                if day is None:
+                    continue
+                if worked_hours is not None:
+                    row[3 + day_index[day]] = round(worked_hours, 2)
+                    total += worked_hours
+                elif check_in_time:
+                    row[3 + day_index[day]] = "P"
+            if row is not None:
+                yield [*row, round(total, 2)]
+        finally:
+            cursor.close()
+            conn.close()
+
+    return generate()
+
+
+def iter_salary_register(month_from, month_to):
+    """
+    Yields the salary_cal register for months month_from..month_to (YYYY-MM,
+    inclusive): a header, then one row per generated slip.
+    """
+    def generate():
+        yield ["Month", "Employee ID", "Name", "Role", "Total Hours",
+               "Hourly Rate", "Total Salary", "Locked"]
+
+        conn = get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT s.month, s.employee_id, e.name, e.role,
+                       s.total_hours, s.hourly_rate_snapshot, s.total_salary, s.locked
+                FROM salary_cal s
+                JOIN employees e ON e.employee_id = s.employee_id
+                WHERE s.month >= ? AND s.month <= ?
+                ORDER BY s.month, s.employee_id
+            """, (month_from, month_to))
+
+            for month, employee_id, name, role, hours, rate, total, locked in _iter_cursor(cursor):
+                yield [month, employee_id, name, role,
+                       round(hours or 0.0, 2), rate, total, "Yes" if locked else "No"]
+        finally:
+            cursor.close()
+            conn.close()
+
+    return generate()
+
+
+# -------------------------
+# DASHBOARD SUMMARY
+# -------------------------
+# The overview page polls this; a few seconds of staleness is fine and
+# saves re-running the aggregates for every terminal
+DASHBOARD_CACHE_SECONDS = 5
+
+_summary_lock = threading.Lock()
+_summary_cache = {"value": None, "expires": 0.0}
+
+
+def _read_dashboard_summary(today, month):
+    conn = get_connection()
+    cursor = conn.cursor()
+    # One read transaction so every figure comes from the same snapshot
+    cursor.execute("BEGIN")
+    try:
+        cursor.execute("""
+            SELECT COALESCE(status, 'active'), COUNT(*), COALESCE(SUM(monthly_salary), 0)
+            FROM employees
+            GROUP BY COALESCE(status, 'active')
+        """)
+        headcount = {}
+        salary_bill = 0.0
+        for status, count, monthly_total in cursor.fetchall():
+            headcount[status] = count
+            if status == "active":
+                salary_bill = monthly_total
+
+        cursor.execute("""
+            SELECT COUNT(a.check_in), COUNT(a.check_out)
+            FROM attendance a
+            JOIN employees e ON e.employee_id = a.employee_id
+            WHERE a.date = ? AND e.status = 'active'
+        """, (today,))
+        present, checked_out = cursor.fetchone()
+
+        cursor.execute("""
+            SELECT COALESCE(SUM(total_hours), 0), COALESCE(SUM(days_present), 0)
+            FROM attendance_monthly
+            WHERE month = ?
+        """, (month,))
+        month_hours, month_days = cursor.fetchone()
+
+        cursor.execute("""
+            SELECT COUNT(*), COALESCE(SUM(total_salary), 0), COALESCE(SUM(locked), 0)
+            FROM salary_cal
+            WHERE month = ?
+        """, (month,))
+        payslips, payroll_total, payslips_locked = cursor.fetchone()
+    finally:
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    active = headcount.get("active", 0)
+    return {
+        "date": today,
+        "month": month,
+        "headcount": {
+            "total": sum(headcount.values()),
+            "by_status": headcount
+        },
+        "today": {
+            "present": present,
+            "absent": max(active - present, 0),
+            "checked_out": checked_out,
+            "still_in": present - checked_out
+        },
+        "month_attendance": {
+            "hours_worked": round(month_hours, 2),
+            "days_present": month_days
+        },
+        "payroll": {
+            "payslips": payslips,
+            "payslips_locked": payslips_locked,
+            "total": round(payroll_total, 2),
+            "active_monthly_salaries": round(salary_bill, 2)
+        }
+    }
+
+
+def get_dashboard_summary():
+    """
+    Returns headcount, today's attendance, this month's hours and payroll
+    totals, cached for DASHBOARD_CACHE_SECONDS.
+    """
+    now = time.monotonic()
+    with _summary_lock:
+        cached = _summary_cache["value"]
+        today = date.today().isoformat()
+        if cached is not None and now < _summary_cache["expires"] and cached["date"] == today:
+            return cached
+
+        summary = _read_dashboard_summary(today, today[:7])
+        _summary_cache["value"] = summary
+        _summary_cache["expires"] = now + DASHBOARD_CACHE_SECONDS
+        return summary
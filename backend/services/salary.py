@@ -1,8 +1,49 @@
-from backend.database import get_connection
+from backend.database import get_connection, transaction
 from datetime import datetime
 import calendar
 # Import the helper to get dynamic hours from DB
-from backend.services.employee import get_daily_required_hours
+from backend.services.settings import get_daily_required_hours
+from backend.services.audit import record_audit
+
+def _required_month_hours(month, required_hours_per_day):
+    year, month_num = map(int, month.split("-"))
+    days_in_month = calendar.monthrange(year, month_num)[1]
+    return days_in_month * required_hours_per_day
+
+def _daily_hours_for_month(cursor, month):
+    """
+    Daily required hours to pay `month` at. A month that has ended keeps the
+    hours recorded in employee_rate_snapshots when the setting was changed
+    during it, so later changes don't alter its payroll; otherwise the
+    current setting applies.
+    """
+    if month < datetime.now().strftime("%Y-%m"):
+        cursor.execute("""
+            SELECT daily_hours
+            FROM employee_rate_snapshots
+            WHERE month = ? AND daily_hours IS NOT NULL
+            ORDER BY recorded_at DESC
+            LIMIT 1
+        """, (month,))
+        row = cursor.fetchone()
+        if row:
+            return row[0]
+    return get_daily_required_hours()
+
+def _hourly_rate_snapshot(monthly_salary, total_month_hours):
+    # Avoid division by zero
+    if total_month_hours > 0:
+        return round(monthly_salary / total_month_hours, 2)
+    return 0.0
+
+def _month_lock_value(month):
+    year, month_num = map(int, month.split("-"))
+    last_day = calendar.monthrange(year, month_num)[1]
+    last_date = datetime(year, month_num, last_day, 23, 59, 59)
+
+    if datetime.now() > last_date:
+        return 1   # Auto lock after month ends
+    return 0       # Editable during month
 
 def generate_salary(employee_id, month, role=None):
     """
@@ -28,11 +69,10 @@ def generate_salary(employee_id, month, role=None):
     # 2️⃣ Calculate total worked hours
     # ------------------------------------
     cursor.execute("""
-        SELECT SUM(worked_hours)
-        FROM attendance
-        WHERE employee_id = ?
-          AND date LIKE ?
-    """, (employee_id, f"{month}-%"))
+        SELECT total_hours
+        FROM attendance_monthly
+        WHERE employee_id = ? AND month = ?
+    """, (employee_id, month))
 
     result = cursor.fetchone()
     total_hours = result[0] if result and result[0] else 0.0
@@ -54,19 +94,9 @@ def generate_salary(employee_id, month, role=None):
 
     monthly_salary = row[0] if row[0] else 0.0
 
-    # Calculate rate dynamically based on THIS month and CURRENT settings
-    year, month_num = map(int, month.split("-"))
-    days_in_month = calendar.monthrange(year, month_num)[1]
-    
-    # Fetch the dynamic setting from DB
-    required_hours_per_day = get_daily_required_hours()
-
-    # Avoid division by zero
-    total_month_hours = days_in_month * required_hours_per_day
-    if total_month_hours > 0:
-        hourly_rate_snapshot = round(monthly_salary / total_month_hours, 2)
-    else:
-        hourly_rate_snapshot = 0.0
+    # Calculate rate dynamically based on THIS month and the hours in effect for it
+    total_month_hours = _required_month_hours(month, _daily_hours_for_month(cursor, month))
+    hourly_rate_snapshot = _hourly_rate_snapshot(monthly_salary, total_month_hours)
 
     # ------------------------------------
     # 4️⃣ Calculate total salary
@@ -76,14 +106,7 @@ def generate_salary(employee_id, month, role=None):
     # ------------------------------------
     # 5️⃣ Determine lock status
     # ------------------------------------
-    last_day = calendar.monthrange(year, month_num)[1]
-    last_date = datetime(year, month_num, last_day, 23, 59, 59)
-    today = datetime.now()
-
-    if today > last_date:
-        lock_value = 1   # Auto lock after month ends
-    else:
-        lock_value = 0   # Editable during month
+    lock_value = _month_lock_value(month)
 
     # ------------------------------------
     # 6️⃣ Insert or Update salary record
@@ -141,6 +164,86 @@ def generate_salary(employee_id, month, role=None):
     conn.close()
 
 
+def generate_all_salaries(month, role=None):
+    """
+    Runs payroll for every active employee for a month (YYYY-MM) in one pass.
+    Applies the same rate, total and lock rules as generate_salary(); locked
+    months are skipped unless role == 'head'.
+    Returns a summary dict with counts, skipped employee IDs and the payroll total.
+    """
+    lock_value = _month_lock_value(month)
+
+    inserts = []
+    updates = []
+    skipped_locked = []
+    total_payroll = 0.0
+
+    with transaction() as conn:
+        cursor = conn.cursor()
+        total_month_hours = _required_month_hours(month, _daily_hours_for_month(cursor, month))
+
+        # One grouped pass: salary base, hours worked and any existing slip per employee
+        cursor.execute("""
+            SELECT e.employee_id,
+                   e.monthly_salary,
+                   COALESCE(h.total_hours, 0.0),
+                   s.salary_id,
+                   s.locked
+            FROM employees e
+            LEFT JOIN attendance_monthly h
+                   ON h.employee_id = e.employee_id
+                  AND h.month = ?
+            LEFT JOIN salary_cal s
+                   ON s.employee_id = e.employee_id
+                  AND s.month = ?
+            WHERE e.status = 'active'
+        """, (month, month))
+
+        for employee_id, monthly_salary, total_hours, salary_id, locked in cursor.fetchall():
+            if salary_id is not None and locked == 1 and lock_value == 1 and role != 'head':
+                skipped_locked.append(employee_id)
+                continue
+
+            hourly_rate_snapshot = _hourly_rate_snapshot(monthly_salary or 0.0, total_month_hours)
+            total_salary = round(total_hours * hourly_rate_snapshot, 2)
+            total_payroll += total_salary
+
+            if salary_id is not None:
+                updates.append((total_hours, hourly_rate_snapshot, total_salary, lock_value, salary_id))
+            else:
+                inserts.append((employee_id, month, total_hours, hourly_rate_snapshot, total_salary, lock_value))
+
+        cursor.executemany("""
+            UPDATE salary_cal
+            SET total_hours = ?,
+                hourly_rate_snapshot = ?,
+                total_salary = ?,
+                locked = ?
+            WHERE salary_id = ?
+        """, updates)
+
+        cursor.executemany("""
+            INSERT INTO salary_cal (
+                employee_id,
+                month,
+                total_hours,
+                hourly_rate_snapshot,
+                total_salary,
+                locked
+            )
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, inserts)
+        cursor.close()
+
+    return {
+        "month": month,
+        "generated": len(inserts),
+        "updated": len(updates),
+        "skipped_locked": skipped_locked,
+        "total_payroll": round(total_payroll, 2)
+    }
+
+
 def get_salary(employee_id, month):
     conn = get_connection()
     cursor = conn.cursor()
@@ -166,7 +269,7 @@ def update_salary_details(employee_id, month, new_salary, role):
     cursor = conn.cursor()
     
     # Check current lock status
-    cursor.execute("SELECT locked FROM salary_cal WHERE employee_id = ? AND month = ?", (employee_id, month))
+    cursor.execute("SELECT locked, total_salary FROM salary_cal WHERE employee_id = ? AND month = ?", (employee_id, month))
     row = cursor.fetchone()
     
     if not row:
@@ -174,7 +277,7 @@ def update_salary_details(employee_id, month, new_salary, role):
         conn.close()
         raise Exception("Salary record not found")
         
-    is_locked = row[0]
+    is_locked, old_salary = row
     
     # GOD MODE LOGIC: If role is 'head', allow update even if locked.
     if is_locked == 1 and role != 'head':
@@ -190,4 +293,9 @@ def update_salary_details(employee_id, month, new_salary, role):
     
     conn.commit()
     cursor.close()
-    conn.close()
\ No newline at end of file
+    conn.close()
+
+    reason = f"total_salary {old_salary} -> {new_salary}"
+    if is_locked == 1:
+        reason += " (locked record, head override)"
+    record_audit("salary_update", f"salary:{employee_id}:{month}", reason)
\ No newline at end of file
@@ -1,119 +1,211 @@
-import os
-import sys
-import shutil
+import sqlite3
+import threading
+import time
 from datetime import datetime
-from backend.database import get_connection
-from backend.services.employee import recalculate_all_employee_rates
+from backend.database import get_connection, transaction
+from backend.services.audit import record_audit, flush_audit_log
 from backend.utils.security import encrypt_date, decrypt_date, encrypt_password, decrypt_password
 
+
 # ---------------------------------------------------------
-# PATH LOGIC FOR PYINSTALLER
+# SETTINGS CACHE
 # ---------------------------------------------------------
-if getattr(sys, 'frozen', False):
-    # Exe Directory
-    BASE_DIR = os.path.dirname(sys.executable)
-else:
-    # Dev Directory (Assuming services/settings.py -> go up 2 levels)
-    BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+# system_settings is tiny and read on almost every request, so it is loaded
+# once and served from memory. In-process writes invalidate it directly;
+# writes from another process (or a restore) are noticed through the
+# settings_generation counter, which triggers bump on every system_settings
+# change and which is checked at most once per VERSION_CHECK_INTERVAL
+# seconds. Unlike PRAGMA data_version it does not move on attendance or
+# other writes, so the cache holds under normal traffic.
+VERSION_CHECK_INTERVAL = 1.0
 
-DB_SOURCE_PATH = os.path.join(BASE_DIR, 'db', 'attendance.db')
-BACKUP_DIR = os.path.join(BASE_DIR, 'BACKUPS')
+# setting_key -> (converter, default when the row is missing)
+SETTING_TYPES = {
+    'daily_hours': (float, 16.0),
+    'demo_mode': (lambda value: value == 'true', True),
+    'sub_expiry': (str, None),
+}
 
-def get_working_hours():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT setting_value FROM system_settings WHERE setting_key = 'daily_hours'")
+
+def _settings_generation(cursor):
+    try:
+        cursor.execute("SELECT generation FROM settings_generation WHERE id = 1")
+    except sqlite3.OperationalError:
+        return None # Database not migrated yet: always reload
     row = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    return float(row[0]) if row else 16.0
+    return row[0] if row else None
 
-def update_working_hours(new_hours):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO system_settings (setting_key, setting_value) 
-        VALUES ('daily_hours', ?) 
-        ON CONFLICT(setting_key) DO UPDATE SET setting_value = excluded.setting_value
-    """, (str(new_hours),))
-    conn.commit()
-    cursor.close()
-    conn.close()
-    recalculate_all_employee_rates()
 
-# --- DEMO MODE LOGIC (NEW) ---
-def get_demo_mode_status():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT setting_value FROM system_settings WHERE setting_key = 'demo_mode'")
-    row = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    # Default to True if the row doesn't exist yet
-    return row[0] == 'true' if row else True
+class SettingsCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = None
+        self._generation = None
+        self._checked_at = 0.0
 
-def update_demo_mode(enabled):
-    val = 'true' if enabled else 'false'
+    def _current_generation(self):
+        conn = get_connection()
+        cursor = conn.cursor()
+        generation = _settings_generation(cursor)
+        cursor.close()
+        conn.close()
+        return generation
+
+    def _load(self):
+        conn = get_connection()
+        cursor = conn.cursor()
+        generation = _settings_generation(cursor)
+        cursor.execute("SELECT setting_key, setting_value FROM system_settings")
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+
+        values = {key: default for key, (_, default) in SETTING_TYPES.items()}
+        for key, raw in rows:
+            if key in SETTING_TYPES:
+                values[key] = SETTING_TYPES[key][0](raw)
+        self._values = values
+        self._generation = generation
+        self._checked_at = time.monotonic()
+
+    def get(self, key):
+        with self._lock:
+            if self._values is None:
+                self._load()
+            elif time.monotonic() - self._checked_at >= VERSION_CHECK_INTERVAL:
+                generation = self._current_generation()
+                if generation is None or generation != self._generation:
+                    self._load()
+                else:
+                    self._checked_at = time.monotonic()
+            return self._values[key]
+
+    def invalidate(self):
+        with self._lock:
+            self._values = None
+
+
+_settings_cache = SettingsCache()
+
+
+def invalidate_settings_cache():
+    _settings_cache.invalidate()
+
+
+def _set_setting(key, value):
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
         INSERT INTO system_settings (setting_key, setting_value) 
-        VALUES ('demo_mode', ?) 
+        VALUES (?, ?) 
         ON CONFLICT(setting_key) DO UPDATE SET setting_value = excluded.setting_value
-    """, (val,))
+    """, (key, value))
     conn.commit()
     cursor.close()
     conn.close()
+    invalidate_settings_cache()
 
-# --- BACKUP LOGIC ---
-def create_database_backup():
-    """
-    Creates a timestamped copy of the database in the BACKUPS folder.
-    """
-    if not os.path.exists(DB_SOURCE_PATH):
-        raise FileNotFoundError(f"Live database file not found at {DB_SOURCE_PATH}")
 
-    # Ensure Backup Directory Exists
-    os.makedirs(BACKUP_DIR, exist_ok=True)
+def get_working_hours():
+    return _settings_cache.get('daily_hours')
 
-    # Create filename: attendance_backup_YYYY-MM-DD_HH-MM-SS.db
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    backup_filename = f"attendance_backup_{timestamp}.db"
-    backup_path = os.path.join(BACKUP_DIR, backup_filename)
+def get_daily_required_hours():
+    return _settings_cache.get('daily_hours')
 
-    # Copy the file (copy2 preserves metadata)
-    shutil.copy2(DB_SOURCE_PATH, backup_path)
-    
-    return backup_filename
+def update_working_hours(new_hours, snapshot_rates=False):
+    # Imported here: employee.py reads its settings from this module
+    from backend.services.employee import recalculate_all_employee_rates
+
+    new_hours = float(new_hours)
+    # Setting and rates change together or not at all
+    with transaction():
+        _set_setting('daily_hours', str(new_hours))
+        recalculate_all_employee_rates(required_hours=new_hours, snapshot=snapshot_rates)
+    invalidate_settings_cache()
+    record_audit("settings_update", "setting:daily_hours", f"daily_hours = {new_hours}")
+
+# --- DEMO MODE LOGIC (NEW) ---
+def get_demo_mode_status():
+    # Defaults to True if the row doesn't exist yet
+    return _settings_cache.get('demo_mode')
+
+def update_demo_mode(enabled):
+    val = 'true' if enabled else 'false'
+    _set_setting('demo_mode', val)
+    record_audit("settings_update", "setting:demo_mode", f"demo_mode = {val}")
 
 # --- SaaS SUBSCRIPTION LOGIC ---
 
 def update_subscription_expiry(date_str):
     encrypted_val = encrypt_date(date_str)
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO system_settings (setting_key, setting_value) 
-        VALUES ('sub_expiry', ?) 
-        ON CONFLICT(setting_key) DO UPDATE SET setting_value = excluded.setting_value
-    """, (encrypted_val,))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    _set_setting('sub_expiry', encrypted_val)
+    _reset_licence_state()
+    record_audit("settings_update", "setting:sub_expiry", f"subscription renewed until {date_str}")
 
 def get_subscription_expiry_encrypted():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT setting_value FROM system_settings WHERE setting_key = 'sub_expiry'")
-    row = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    return row[0] if row else None
+    return _settings_cache.get('sub_expiry')
+
+# Decrypting the licence token costs a Fernet HMAC + AES pass and gives the
+# same answer until the token changes or the expiry instant passes, so the
+# result is memoized per token together with the moment it stops being valid.
+_licence_lock = threading.Lock()
+_licence_state = None   # (token, is_active, label, expiry_date_str, valid_until)
+
+def _compute_licence_state(token):
+    if not token:
+        # No date set: default to Active (see is_subscription_active)
+        return (token, True, "No Limit", None, None)
+
+    expiry_date_str = decrypt_date(token)
+    try:
+        expiry = datetime.strptime(expiry_date_str, "%Y-%m-%d")
+    except Exception as e:
+        print(f"Crypto Error: {e}")
+        return (token, False, "Error", expiry_date_str, None)
+
+    if datetime.now() < expiry:
+        # Active until the expiry instant, then must be re-evaluated
+        return (token, True, expiry_date_str, expiry_date_str, expiry)
+    return (token, False, expiry_date_str, expiry_date_str, None)
+
+def _reset_licence_state():
+    global _licence_state
+    with _licence_lock:
+        _licence_state = None
+
+def _get_licence_state():
+    global _licence_state
+    token = get_subscription_expiry_encrypted()
+    with _licence_lock:
+        state = _licence_state
+        if (
+            state is None
+            or state[0] != token
+            or (state[4] is not None and datetime.now() >= state[4])
+        ):
+            state = _compute_licence_state(token)
+            _licence_state = state
+        return state
+
+def get_subscription_status():
+    """
+    Cheap licence check. Returns (Boolean is_active, String expiry_label),
+    matching is_subscription_active() for the stored token.
+    """
+    _, is_active, label, _, _ = _get_licence_state()
+    return is_active, label
+
+def get_subscription_expiry_date():
+    """Returns the decrypted expiry date (YYYY-MM-DD) or None."""
+    return _get_licence_state()[3]
 
 # --- USER MANAGEMENT HELPERS ---
 
 def _renumber_users(cursor):
     cursor.execute("PRAGMA foreign_keys = OFF")
+    # foreign_keys cannot change inside a transaction; defer the checks to
+    # COMMIT instead so audit_logs can follow the renumbered IDs
+    cursor.execute("PRAGMA defer_foreign_keys = ON")
     cursor.execute("SELECT user_id FROM users ORDER BY user_id ASC")
     users = cursor.fetchall()
     
@@ -122,6 +214,7 @@ def _renumber_users(cursor):
         expected_id = index + 1
         if current_id != expected_id:
             cursor.execute("UPDATE users SET user_id = ? WHERE user_id = ?", (expected_id, current_id))
+            cursor.execute("UPDATE audit_logs SET user_id = ? WHERE user_id = ?", (expected_id, current_id))
 
     cursor.execute("DELETE FROM sqlite_sequence WHERE name='users'")
     cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('users', ?)", (len(users),))
@@ -147,6 +240,7 @@ def add_system_user(username, password, role):
     conn.commit()
     cursor.close()
     conn.close()
+    record_audit("user_add", f"user:{username}", f"role = {role}")
 
 def get_all_system_users():
     conn = get_connection()
@@ -176,12 +270,23 @@ def update_user_password(user_id, new_password):
     conn.commit()
     cursor.close()
     conn.close()
+    record_audit("user_password_change", f"user:{user_id}")
 
 def delete_system_user(target_user_id, current_user_id_requesting=None):
+    # Validate the IDs before anything is written, so a bad value cannot
+    # fail the request after the delete has committed
+    try:
+        target_user_id = int(target_user_id)
+        actor_id = int(current_user_id_requesting) if current_user_id_requesting else None
+    except (TypeError, ValueError):
+        raise ValueError("Invalid user ID")
+
+    # User IDs are renumbered below; queued audit entries must land first
+    flush_audit_log()
     conn = get_connection()
     cursor = conn.cursor()
     
-    cursor.execute("SELECT role FROM users WHERE user_id = ?", (target_user_id,))
+    cursor.execute("SELECT role, username FROM users WHERE user_id = ?", (target_user_id,))
     target = cursor.fetchone()
     
     if not target:
@@ -191,7 +296,7 @@ def delete_system_user(target_user_id, current_user_id_requesting=None):
         
     target_role = target[0]
 
-    if current_user_id_requesting and str(target_user_id) == str(current_user_id_requesting):
+    if actor_id == target_user_id:
         cursor.close()
         conn.close()
         raise ValueError("You cannot delete your own account while logged in.")
@@ -204,9 +309,14 @@ def delete_system_user(target_user_id, current_user_id_requesting=None):
             conn.close()
             raise ValueError("Cannot delete the only remaining Head/Developer account.")
 
+    # Keep the deleted user's audit history, detached from the account
+    cursor.execute("UPDATE audit_logs SET user_id = NULL WHERE user_id = ?", (target_user_id,))
     cursor.execute("DELETE FROM users WHERE user_id = ?", (target_user_id,))
     _renumber_users(cursor)
     
     conn.commit()
     cursor.close()
-    conn.close()
\ No newline at end of file
+    conn.close()
+    if actor_id and actor_id > target_user_id:
+        actor_id -= 1 # Renumbering closed the gap below the actor
+    record_audit("user_delete", f"user:{target[1]}", f"role = {target_role}", user_id=actor_id)
\ No newline at end of file
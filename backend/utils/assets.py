@@ -0,0 +1,111 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip variants are always built
+    brotli = None
+
+# ---------------------------------------------------------
+# FINGERPRINTED STATIC ASSETS
+# ---------------------------------------------------------
+# Every file under static/ is read once at startup, hashed and
+# precompressed. Templates link to /assets/<hash>/<path>, so a URL's
+# content never changes and browsers may cache it for a year; editing a
+# file changes its hash and therefore its URL.
+
+# Scripts and stylesheets each page loads, in order. With bundling on they
+# are served as one concatenated file per bundle.
+ASSET_BUNDLES = {
+    "bundle/app.css": (
+        "css/theme.css",
+        "css/layout.css",
+        "css/components.css",
+    ),
+    "bundle/login.js": (
+        "js/config.js",
+        "js/utils.js",
+        "js/auth.js",
+    ),
+    "bundle/dashboard.js": (
+        "js/config.js",
+        "js/utils.js",
+        "js/auth.js",
+        "js/employees.js",
+        "js/attendance.js",
+        "js/salary.js",
+        "js/employee_profile.js",
+        "js/settings.js",
+        "js/bulk_attendance.js",
+    ),
+}
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_BYTES = 512
+HASH_LENGTH = 12
+
+
+class Asset:
+    def __init__(self, path, content):
+        self.path = path
+        self.content = content
+        self.digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+        self.mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.encoded = {}
+
+        # Only keep a compressed variant when it is actually smaller
+        if len(content) >= MIN_COMPRESS_BYTES and self.mimetype.startswith(COMPRESSIBLE_TYPES):
+            variants = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants["br"] = brotli.compress(content)
+            for encoding, data in variants.items():
+                if len(data) < len(content):
+                    self.encoded[encoding] = data
+
+    def negotiate(self, accept_encoding):
+        """Returns (encoding or None, body) for the client's Accept-Encoding header."""
+        accepted = {part.split(";")[0].strip().lower() for part in (accept_encoding or "").split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.encoded:
+                return encoding, self.encoded[encoding]
+        return None, self.content
+
+
+class AssetManifest:
+    def __init__(self, static_folder, bundle=False):
+        self.static_folder = static_folder
+        self.bundle = bundle
+        self.assets = {}
+
+        for root, _, files in os.walk(static_folder):
+            for name in files:
+                abs_path = os.path.join(root, name)
+                rel_path = os.path.relpath(abs_path, static_folder).replace(os.sep, "/")
+                with open(abs_path, "rb") as f:
+                    self.assets[rel_path] = Asset(rel_path, f.read())
+
+        for bundle_path, members in ASSET_BUNDLES.items():
+            # Each member ends with a newline so the last statement of one
+            # script cannot run into the first statement of the next
+            content = b"".join(
+                self.assets[member].content.rstrip() + b"\n"
+                for member in members if member in self.assets
+            )
+            self.assets[bundle_path] = Asset(bundle_path, content)
+
+    def get(self, path):
+        return self.assets.get(path)
+
+    def url(self, path):
+        asset = self.assets.get(path)
+        if asset is None:
+            return f"/static/{path}"
+        return f"/assets/{asset.digest}/{path}"
+
+    def urls(self, bundle_path):
+        """URLs to load for a bundle: the bundle itself, or each member in order."""
+        if self.bundle:
+            return [self.url(bundle_path)]
+        return [self.url(member) for member in ASSET_BUNDLES[bundle_path]]
@@ -0,0 +1,16 @@
+from datetime import date
+
+
+def month_date_range(month):
+    """
+    Converts a month string (YYYY-MM) into a half-open ISO date range
+    (first_day, first_day_of_next_month), suitable for index-friendly
+    `date >= ? AND date < ?` predicates.
+    """
+    year, month_num = map(int, month.split("-"))
+    start = date(year, month_num, 1)
+    if month_num == 12:
+        end = date(year + 1, 1, 1)
+    else:
+        end = date(year, month_num + 1, 1)
+    return start.isoformat(), end.isoformat()
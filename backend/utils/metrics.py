@@ -0,0 +1,84 @@
+import bisect
+import threading
+
+# ---------------------------------------------------------
+# REQUEST METRICS
+# ---------------------------------------------------------
+# Per-route latency, response status counts and the number/time of
+# SQLite statements each request ran, kept in memory and rendered in
+# the Prometheus text exposition format by /metrics.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+_lock = threading.Lock()
+_latency = {}       # (method, route) -> Histogram
+_statements = {}    # (method, route) -> Histogram
+_sql_seconds = {}   # (method, route) -> total seconds spent in SQLite
+_responses = {}     # (method, route, status) -> count
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+def observe_request(method, route, status, seconds, sql_count, sql_seconds):
+    """Records one finished request."""
+    key = (method, route)
+    with _lock:
+        _latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+        _statements.setdefault(key, Histogram(STATEMENT_BUCKETS)).observe(sql_count)
+        _sql_seconds[key] = _sql_seconds.get(key, 0.0) + sql_seconds
+        _responses[key + (status,)] = _responses.get(key + (status,), 0) + 1
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _render_histogram(lines, name, help_text, histograms):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route), histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+            cumulative += count
+            le = bound if bound == "+Inf" else f"{bound:g}"
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=le)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {histogram.total:g}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {cumulative}")
+
+
+def render_prometheus():
+    """Returns every metric in the Prometheus text format (version 0.0.4)."""
+    lines = []
+    with _lock:
+        _render_histogram(lines, "attendance_http_request_duration_seconds",
+                          "Time spent handling a request.", _latency)
+
+        lines.append("# HELP attendance_http_requests_total Responses sent, by status code.")
+        lines.append("# TYPE attendance_http_requests_total counter")
+        for (method, route, status), count in sorted(_responses.items()):
+            lines.append(f"attendance_http_requests_total"
+                         f"{_labels(method=method, route=route, status=status)} {count}")
+
+        _render_histogram(lines, "attendance_sql_statements_per_request",
+                          "SQLite statements executed while handling a request.", _statements)
+
+        lines.append("# HELP attendance_sql_seconds_total Time spent in SQLite while handling requests.")
+        lines.append("# TYPE attendance_sql_seconds_total counter")
+        for (method, route), seconds in sorted(_sql_seconds.items()):
+            lines.append(f"attendance_sql_seconds_total{_labels(method=method, route=route)} {seconds:g}")
+
+    return "\n".join(lines) + "\n"
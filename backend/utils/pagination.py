@@ -0,0 +1,19 @@
+import base64
+import json
+
+
+def encode_cursor(*values):
+    """Packs the sort values of the last row on a page into an opaque token."""
+    raw = json.dumps(list(values)).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(token, size):
+    """Unpacks a token made by encode_cursor(); raises ValueError if malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
@@ -0,0 +1,99 @@
+import logging
+import os
+import sqlite3
+import threading
+from logging.handlers import RotatingFileHandler
+
+# ---------------------------------------------------------
+# SLOW-QUERY PROFILER
+# ---------------------------------------------------------
+# Off unless enable_query_profiler() is called. Every statement run through
+# a pooled connection is then timed, including the fetches that read its
+# rows (see InstrumentedCursor in database.py). Statements slower than the
+# threshold are logged, and each distinct statement is explained once so
+# full table scans are logged even when they are still fast. Bound
+# parameters are never written to the log, only their types.
+
+DEFAULT_THRESHOLD_MS = 100
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+MAX_EXPLAINED_STATEMENTS = 2000
+
+# Only these statements have a query plan worth looking at
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+
+enabled = False
+_threshold_seconds = DEFAULT_THRESHOLD_MS / 1000
+_logger = logging.getLogger("attendance.sql")
+_plans = {}  # normalized SQL -> full-scan plan lines (empty if none)
+_plans_lock = threading.Lock()
+
+
+def enable_query_profiler(log_path, threshold_ms=DEFAULT_THRESHOLD_MS):
+    """Starts logging slow statements and full scans to a rotating file at `log_path`."""
+    global enabled, _threshold_seconds
+    os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+
+    for handler in list(_logger.handlers):
+        _logger.removeHandler(handler)
+        handler.close()
+    handler = RotatingFileHandler(log_path, maxBytes=LOG_MAX_BYTES,
+                                  backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    _logger.addHandler(handler)
+    _logger.setLevel(logging.INFO)
+    _logger.propagate = False
+
+    _threshold_seconds = threshold_ms / 1000
+    enabled = True
+    print(f"Query profiler: logging statements over {threshold_ms:g} ms and full scans to {log_path}")
+
+
+def _redact(parameters):
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return [type(value).__name__ for value in parameters]
+
+
+def _full_scans(conn, sql, parameters):
+    """Returns the SCAN lines of the statement's query plan, or () if it has none."""
+    try:
+        # A plain cursor, so explaining is not itself timed or profiled
+        cursor = sqlite3.Cursor(conn)
+        try:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, parameters)
+            details = [row[3] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except sqlite3.Error:
+        return ()
+    return tuple(d for d in details if d.startswith("SCAN") and "CONSTANT ROW" not in d)
+
+
+def observe_statement(conn, seconds, sql, parameters=(), many=False):
+    """Called once per statement, after its rows have been read, while the profiler is enabled."""
+    statement = " ".join(sql.split())
+    if not statement.upper().startswith(EXPLAINABLE):
+        scans, first_seen = (), False
+    else:
+        with _plans_lock:
+            scans = _plans.get(statement)
+        first_seen = scans is None
+        if first_seen:
+            # executemany: explain with the first parameter set, if it can be read twice
+            if many:
+                parameters = parameters[0] if isinstance(parameters, (list, tuple)) and parameters else None
+            scans = _full_scans(conn, sql, parameters) if parameters is not None else ()
+            with _plans_lock:
+                if len(_plans) >= MAX_EXPLAINED_STATEMENTS:
+                    _plans.clear()
+                _plans[statement] = scans
+
+    slow = seconds >= _threshold_seconds
+    if not slow and not (scans and first_seen):
+        return
+
+    kind = "SLOW" if slow else "SCAN"
+    params = "" if many or parameters is None else f" | params={_redact(parameters)}"
+    plan = f" | plan: {'; '.join(scans)}" if scans else ""
+    _logger.info(f"{kind} {seconds * 1000:.1f} ms | {statement}{params}{plan}")
@@ -39,7 +39,7 @@ async function handleCheckIn() {
 
     const response = await fetch(`${API_BASE}/attendance/checkin`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: jsonHeaders(),
       body: JSON.stringify(payload),
     });
 
@@ -88,7 +88,7 @@ async function handleCheckOut() {
 
     const response = await fetch(`${API_BASE}/attendance/checkout`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: jsonHeaders(),
       body: JSON.stringify(payload),
     });
 
@@ -122,32 +122,40 @@ function formatTime12Hour(timeStr) {
   return `${hours}:${minutes} ${suffix}`;
 }
 
-async function loadAttendanceHistory(empId) {
+// Rows fetched per page of attendance history
+const ATTENDANCE_PAGE_SIZE = 60;
+
+async function loadAttendanceHistory(empId, cursor) {
   // If no ID passed, try to get from dropdown
   if (!empId) empId = document.getElementById("att-employee-select").value;
   if (!empId) return;
 
   const tbody = document.getElementById("attendance-table-body");
-  if (tbody)
+  if (tbody && !cursor)
     tbody.innerHTML = `<tr><td colspan="4" style="text-align:center;">Loading...</td></tr>`;
 
   try {
+    let url = `${API_BASE}/attendance/${empId}?limit=${ATTENDANCE_PAGE_SIZE}`;
+    if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
     // Cache busting timestamp
-    const response = await fetch(
-      `${API_BASE}/attendance/${empId}?t=${new Date().getTime()}`,
-    );
+    const response = await fetch(`${url}&t=${new Date().getTime()}`);
 
     if (response.ok) {
       const data = await response.json();
       if (tbody) {
-        tbody.innerHTML = "";
+        if (cursor) {
+          const moreRow = document.getElementById("attendance-load-more");
+          if (moreRow) moreRow.remove();
+        } else {
+          tbody.innerHTML = "";
+        }
 
-        if (data.length === 0) {
+        if (data.records.length === 0 && !cursor) {
           tbody.innerHTML = `<tr><td colspan="4" style="text-align:center;">No records found for this employee.</td></tr>`;
           return;
         }
 
-        data.forEach((record) => {
+        data.records.forEach((record) => {
           const tr = document.createElement("tr");
           const checkInTime = record.check_in
             ? formatTime12Hour(record.check_in)
@@ -164,6 +172,16 @@ async function loadAttendanceHistory(empId) {
                     `;
           tbody.appendChild(tr);
         });
+
+        if (data.next_cursor) {
+          const tr = document.createElement("tr");
+          tr.id = "attendance-load-more";
+          tr.innerHTML = `<td colspan="4" style="text-align:center;"><button class="btn" style="padding:4px 12px;">Load older records</button></td>`;
+          tr.querySelector("button").addEventListener("click", () => {
+            loadAttendanceHistory(empId, data.next_cursor);
+          });
+          tbody.appendChild(tr);
+        }
       }
     } else {
       console.error("Failed to fetch attendance history");
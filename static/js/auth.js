@@ -27,7 +27,7 @@ async function handleLogin(event) {
   try {
     const res = await fetch(`${API_BASE}/login`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: jsonHeaders(),
       body: JSON.stringify({ username, password }),
     });
 
@@ -10,11 +10,15 @@ if (typeof bulkEmployeeList === "undefined") {
 
 async function loadBulkAttendanceList() {
   try {
-    const response = await fetch(`${API_BASE}/employees`);
+    // Only active employees can be marked; let the server filter them
+    const response = await fetch(
+      `${API_BASE}/employees?status=active&fields=id,name,role,status`,
+    );
     if (!response.ok) return;
 
     // Update the global variable
-    bulkEmployeeList = await response.json();
+    const data = await response.json();
+    bulkEmployeeList = data.employees;
     renderBulkTable(bulkEmployeeList);
   } catch (error) {
     console.error("Bulk list load error:", error);
@@ -82,28 +86,36 @@ async function submitBulkAttendance() {
   let successCount = 0;
   let failCount = 0;
 
-  for (const id of idsToMark) {
-    try {
-      const res = await fetch(`${API_BASE}/attendance/checkin`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ employee_id: id }),
-      });
-
-      if (res.ok) {
+  try {
+    // One request marks the whole selection in a single transaction
+    const res = await fetch(`${API_BASE}/attendance/bulk_checkin`, {
+      method: "POST",
+      headers: jsonHeaders(),
+      body: JSON.stringify({ employee_ids: idsToMark }),
+    });
+    const data = await res.json();
+
+    if (res.ok) {
+      data.results.forEach((result) => {
+        if (!result.ok) {
+          failCount++;
+          return;
+        }
         successCount++;
-        const chk = document.querySelector(`.bulk-check[value="${id}"]`);
+        const chk = document.querySelector(
+          `.bulk-check[value="${result.employee_id}"]`,
+        );
         if (chk) {
           chk.checked = false;
           chk.disabled = true;
           chk.parentElement.innerHTML = "✅";
         }
-      } else {
-        failCount++;
-      }
-    } catch (err) {
-      failCount++;
+      });
+    } else {
+      failCount = idsToMark.length;
     }
+  } catch (err) {
+    failCount = idsToMark.length;
   }
 
   const masterCheck = document.getElementById("bulk-check-all");
@@ -1,2 +1,10 @@
 // Set to empty string for relative paths (works automatically with Flask)
 const API_BASE = "";
+
+// JSON request headers; X-User-Id attributes audited changes to the logged-in user
+function jsonHeaders() {
+  return {
+    "Content-Type": "application/json",
+    "X-User-Id": sessionStorage.getItem("user_id") || "",
+  };
+}
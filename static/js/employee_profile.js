@@ -131,7 +131,9 @@ function loadEmployeeDocuments(employeeId) {
 
       docs.forEach((doc) => {
         const tr = document.createElement("tr");
-        const fileName = doc.file_path.split("\\").pop().split("/").pop();
+        const fileName =
+          doc.original_name ||
+          doc.file_path.split("\\").pop().split("/").pop();
 
         let formattedDate = doc.uploaded_at;
         if (typeof formatDateTime12Hour === "function") {
@@ -144,7 +146,10 @@ function loadEmployeeDocuments(employeeId) {
           // Ensure API_BASE doesn't have trailing slash if doc.file_path starts with one, or handle logic
           // Assuming API_BASE is e.g. http://localhost:5000 and doc.file_path is UPLOADS/employee_1/file.png
           const relativePath = doc.file_path.replace(/\\/g, "/");
-          const viewBtn = `<a href="${API_BASE}/${relativePath}" target="_blank" class="btn btn-primary" style="padding:4px 8px; font-size:0.8rem; text-decoration:none; margin-right: 5px;">View</a>`;
+          const fileUrl = doc.url
+            ? `${API_BASE}${doc.url}`
+            : `${API_BASE}/${relativePath}`;
+          const viewBtn = `<a href="${fileUrl}" target="_blank" class="btn btn-primary" style="padding:4px 8px; font-size:0.8rem; text-decoration:none; margin-right: 5px;">View</a>`;
           const deleteBtn = `<button onclick="deleteDocument(${doc.doc_id})" class="btn" style="background:var(--danger); color:white; padding:4px 8px; font-size:0.8rem;">Delete</button>`;
           actions = viewBtn + deleteBtn;
         }
@@ -180,7 +185,7 @@ function deleteDocument(docId) {
 function executeDelete(docId) {
   fetch(`${API_BASE}/documents/delete`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers: jsonHeaders(),
     body: JSON.stringify({ doc_id: docId }),
   })
     .then((res) => res.json())
@@ -199,9 +204,9 @@ function executeDelete(docId) {
    LOAD EMPLOYEE LIST (DETAILS SECTION)
 ========================= */
 function loadProfileEmployeeList() {
-  fetch(`${API_BASE}/employees`)
+  fetch(`${API_BASE}/employees?fields=id,name,role`)
     .then((res) => res.json())
-    .then((employees) => {
+    .then(({ employees }) => {
       const tbody = document.getElementById("profile-employee-list-body");
       tbody.innerHTML = "";
 
@@ -367,9 +372,9 @@ document.addEventListener("DOMContentLoaded", () => {
 });
 
 function loadDashboardEmployeeList() {
-  fetch(`${API_BASE}/employees`)
+  fetch(`${API_BASE}/employees?fields=id,name,role`)
     .then((res) => res.json())
-    .then((employees) => {
+    .then(({ employees }) => {
       const tbody = document.getElementById("dashboard-employee-list-body");
 
       if (!tbody) return;
@@ -8,9 +8,10 @@ async function loadEmployees() {
     const response = await fetch(`${API_BASE}/employees`);
     if (!response.ok) throw new Error("Failed to fetch employees");
 
-    const employees = await response.json();
+    const data = await response.json();
+    const employees = data.employees;
     renderEmployeeTable(employees);
-    updateDashboardStats(employees.length);
+    updateDashboardStats(data.total);
 
     const event = new CustomEvent("employeesLoaded", { detail: employees });
     window.dispatchEvent(event);
@@ -33,7 +34,7 @@ function deactivateEmployee(id, event) {
   showConfirmModal("Deactivate this employee account?", async () => {
     const response = await fetch(`${API_BASE}/employee/deactivate`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: jsonHeaders(),
       body: JSON.stringify({ employee_id: id }),
     });
 
@@ -58,7 +59,7 @@ async function activateEmployee(id, event) {
 
   const response = await fetch(`${API_BASE}/employee/activate`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers: jsonHeaders(),
     body: JSON.stringify({ employee_id: id }),
   });
 
@@ -85,7 +86,7 @@ async function deleteEmployee(id, event) {
     async () => {
       const response = await fetch(`${API_BASE}/employee/delete`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: jsonHeaders(),
         body: JSON.stringify({ employee_id: id }),
       });
 
@@ -176,7 +177,7 @@ async function addEmployee(event) {
   try {
     const response = await fetch(`${API_BASE}/employee/add`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: jsonHeaders(),
       body: JSON.stringify(payload),
     });
 
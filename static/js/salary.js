@@ -83,7 +83,7 @@ async function generateSalary() {
     // 1. Attempt to Generate
     const genRes = await fetch(`${API_BASE}/salary/generate`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: jsonHeaders(),
       body: JSON.stringify({
         employee_id: parseInt(empId),
         month: monthStr,
@@ -111,6 +111,53 @@ async function generateSalary() {
   }
 }
 
+async function generateAllSalaries() {
+  const monthStr = getSelectedMonthStr();
+  const role = sessionStorage.getItem("role");
+
+  if (!monthStr) {
+    if (window.showToast) showToast("Please select month and year", "error");
+    return;
+  }
+
+  const btn = document.getElementById("salary-generate-all-btn");
+  if (btn) btn.disabled = true;
+
+  try {
+    const res = await fetch(`${API_BASE}/salary/generate_all`, {
+      method: "POST",
+      headers: jsonHeaders(),
+      body: JSON.stringify({ month: monthStr, role: role }),
+    });
+    const data = await res.json();
+
+    if (res.ok) {
+      let msg = `Payroll: ${data.generated} new, ${data.updated} updated (₹${data.total_payroll})`;
+      if (data.skipped_locked.length > 0)
+        msg += `, ${data.skipped_locked.length} locked`;
+      if (window.showToast) showToast(msg, "success");
+    } else {
+      if (window.showToast)
+        showToast("Error: " + (data.message || "Unknown error"), "error");
+    }
+  } catch (error) {
+    console.error(error);
+    if (window.showToast) showToast("Server Connection Error", "error");
+  } finally {
+    if (btn) btn.disabled = false;
+  }
+}
+
+function exportRegister(kind) {
+  const monthStr = getSelectedMonthStr();
+  if (!monthStr) {
+    if (window.showToast) showToast("Please select month and year", "error");
+    return;
+  }
+  // The browser streams the file straight to disk
+  window.location.href = `${API_BASE}/export/${kind}?month=${monthStr}&format=xlsx`;
+}
+
 async function viewSalary() {
   const empId = document.getElementById("salary-employee-select").value;
   const monthStr = getSelectedMonthStr();
@@ -213,7 +260,7 @@ function saveEditedSalary(empId, month) {
 
   fetch(`${API_BASE}/salary/update`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers: jsonHeaders(),
     body: JSON.stringify({
       employee_id: empId,
       month: month,
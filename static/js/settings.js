@@ -31,13 +31,30 @@ async function triggerDatabaseBackup() {
     btn.innerText = "Backing up...";
     btn.disabled = true;
 
-    const res = await fetch(`${API_BASE}/settings/backup`, { method: "POST" });
-    const data = await res.json();
+    const res = await fetch(`${API_BASE}/settings/backup`, {
+      method: "POST",
+      headers: jsonHeaders(),
+      body: JSON.stringify({ compress: true }),
+    });
+    let data = await res.json();
 
-    if (res.ok) {
-      if (window.showToast) showToast("Backup Successful!", "success");
+    // The backup runs in the background; poll until it finishes
+    while (res.ok && (data.state === "queued" || data.state === "running")) {
+      if (data.pages_total)
+        btn.innerText = `Backing up... ${Math.round((100 * data.pages_done) / data.pages_total)}%`;
+      await new Promise((resolve) => setTimeout(resolve, 500));
+      const statusRes = await fetch(
+        `${API_BASE}/settings/backup/${data.job_id}`,
+      );
+      data = await statusRes.json();
+    }
+
+    if (res.ok && data.state === "done") {
+      if (window.showToast)
+        showToast(`Backup Successful! (${data.filename})`, "success");
     } else {
-      if (window.showToast) showToast(data.message, "error");
+      if (window.showToast)
+        showToast(data.error || data.message || "Backup failed", "error");
     }
 
     btn.innerText = origText;
@@ -68,7 +85,7 @@ async function saveRenewalDate(event) {
   try {
     const res = await fetch(`${API_BASE}/settings/renewal`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: jsonHeaders(),
       body: JSON.stringify({ date: dateStr }),
     });
 
@@ -100,7 +117,7 @@ function toggleDemoMode() {
 
   fetch(`${API_BASE}/settings/demo`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers: jsonHeaders(),
     body: JSON.stringify({ enabled: toggle.checked }),
   })
     .then((res) => res.json())
@@ -163,7 +180,7 @@ async function saveWorkingHours(event) {
   try {
     const res = await fetch(`${API_BASE}/settings/hours`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: jsonHeaders(),
       body: JSON.stringify({ hours: parseFloat(hours) }),
     });
 
@@ -195,7 +212,7 @@ async function addSystemUser(event) {
   try {
     const res = await fetch(`${API_BASE}/users/add`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: jsonHeaders(),
       body: JSON.stringify({ username: u, password: p, role: r }),
     });
 
@@ -219,7 +236,7 @@ async function updateUserPassword(userId) {
   try {
     const res = await fetch(`${API_BASE}/users/password`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: jsonHeaders(),
       body: JSON.stringify({ user_id: userId, password: newPass }),
     });
 
@@ -243,7 +260,7 @@ async function deleteSystemUser(userId) {
       try {
         const res = await fetch(`${API_BASE}/users/delete`, {
           method: "POST",
-          headers: { "Content-Type": "application/json" },
+          headers: jsonHeaders(),
           body: JSON.stringify({
             user_id: userId,
             current_user_id: currentUserId,
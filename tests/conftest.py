@@ -0,0 +1,35 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend import database
+
+# Redirect the database before anything (e.g. backend.app) opens it
+database.DB_PATH = os.path.join(tempfile.mkdtemp(prefix="attendance-tests-"), "attendance.db")
+
+from backend.services import documents
+from backend.services.settings import invalidate_settings_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_db(tmp_path, monkeypatch):
+    """Gives every test its own migrated database and upload area under tmp_path."""
+    database.end_request_scope()
+    database.close_all_connections()
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "attendance.db"))
+    monkeypatch.setattr(documents, "BASE_DIR", str(tmp_path))
+    database.employee_db()
+    invalidate_settings_cache()
+    yield tmp_path
+    database.end_request_scope()
+    database.close_all_connections()
+
+
+@pytest.fixture
+def client():
+    from backend.app import app
+    return app.test_client()
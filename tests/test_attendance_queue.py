@@ -0,0 +1,18 @@
+import json
+from datetime import date
+
+from backend.services import attendance_queue
+
+
+def test_unwritable_entries_go_to_the_dead_letter_file(fresh_db, monkeypatch):
+    dead_letter = fresh_db / "dead_letter.jsonl"
+    monkeypatch.setattr(attendance_queue, "DEAD_LETTER_PATH", str(dead_letter))
+    today = date.today().isoformat()
+
+    # No employee 999: the foreign key rejects the acknowledged check-in
+    attendance_queue._write_batch([("in", 999, today, "09:00:00", None)])
+
+    entries = [json.loads(line) for line in dead_letter.read_text().splitlines()]
+    assert [(e["kind"], e["employee_id"], e["date"], e["time"]) for e in entries] == [
+        ("in", 999, today, "09:00:00")
+    ]
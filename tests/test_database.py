@@ -0,0 +1,58 @@
+import sqlite3
+
+import pytest
+
+from backend.database import begin_request_scope, end_request_scope, get_connection
+
+
+def _add_employee(name):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO employees (name, role, monthly_salary) VALUES (?, 'r', 1000)", (name,))
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def _employee_names():
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM employees ORDER BY employee_id")
+    names = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    return names
+
+
+def _failing_service():
+    # Writes, then fails before committing or closing, like a service hitting an error
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO employees (name, role, monthly_salary) VALUES ('lost', 'r', 1000)")
+    cursor.execute("INSERT INTO no_such_table VALUES (1)")
+
+
+def test_failed_service_writes_are_not_committed_by_a_later_service():
+    begin_request_scope()
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            _failing_service()
+        _add_employee("kept")
+    finally:
+        end_request_scope()
+
+    assert _employee_names() == ["kept"]
+
+
+def test_closing_a_nested_handle_keeps_the_callers_writes():
+    begin_request_scope()
+    try:
+        outer = get_connection()
+        outer.execute("INSERT INTO employees (name, role, monthly_salary) VALUES ('outer', 'r', 1000)")
+        assert _employee_names() == ["outer"]  # the helper closes its own handle
+        outer.commit()
+        outer.close()
+    finally:
+        end_request_scope()
+
+    assert _employee_names() == ["outer"]
@@ -0,0 +1,36 @@
+import io
+import os
+import sqlite3
+
+import pytest
+
+from backend.services.documents import store_document
+
+
+def _blob_files(base_dir):
+    blob_dir = os.path.join(base_dir, "UPLOADS", "blobs")
+    return [
+        name
+        for root, _, files in os.walk(blob_dir)
+        if os.path.basename(root) != "tmp"
+        for name in files
+    ]
+
+
+def test_upload_for_missing_employee_leaves_no_blob(client, fresh_db):
+    response = client.post(
+        "/employee/999/documents",
+        data={"doc_type": "id", "adhaar_no": "1", "file": (io.BytesIO(b"x" * 4096), "id.pdf")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 404
+    assert _blob_files(fresh_db) == []
+
+
+def test_failed_document_insert_removes_the_new_blob(fresh_db):
+    # Bypasses the route's check, as when the employee is deleted mid-upload
+    with pytest.raises(sqlite3.IntegrityError):
+        store_document(999, "id", "1", io.BytesIO(b"y" * 4096), "id.pdf")
+
+    assert _blob_files(fresh_db) == []
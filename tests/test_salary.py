@@ -0,0 +1,45 @@
+from backend.database import get_connection
+from backend.services.employee import add_employee
+from backend.services.salary import generate_all_salaries, generate_salary, get_salary
+from backend.services.settings import update_working_hours
+
+PAST_MONTH = "2024-02"  # 29 days
+
+
+def _record_past_month(employee_id, daily_hours, worked_hours):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO employee_rate_snapshots (employee_id, month, hourly_rate, daily_hours, recorded_at)
+        VALUES (?, ?, 0, ?, '2024-02-10 09:00:00')
+    """, (employee_id, PAST_MONTH, daily_hours))
+    cursor.execute("""
+        INSERT INTO attendance_monthly (employee_id, month, total_hours, days_present)
+        VALUES (?, ?, ?, 1)
+    """, (employee_id, PAST_MONTH, worked_hours))
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def _employee_id(name):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT employee_id FROM employees WHERE name = ?", (name,))
+    employee_id = cursor.fetchone()[0]
+    cursor.close()
+    conn.close()
+    return employee_id
+
+
+def test_ended_month_is_paid_at_its_recorded_daily_hours():
+    add_employee("A", "r", None, None, 29000)
+    employee_id = _employee_id("A")
+    _record_past_month(employee_id, daily_hours=10, worked_hours=100)
+    update_working_hours(5)  # a later change must not reprice February
+
+    generate_salary(employee_id, PAST_MONTH, role="head")
+    assert get_salary(employee_id, PAST_MONTH)[2] == 100.0  # 29000 / (29 * 10)
+
+    generate_all_salaries(PAST_MONTH, role="head")
+    assert get_salary(employee_id, PAST_MONTH)[2:4] == (100.0, 10000.0)
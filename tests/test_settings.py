@@ -0,0 +1,29 @@
+from backend.database import get_connection
+from backend.services import settings
+from backend.services.settings import get_daily_required_hours
+
+
+def _execute(sql, params=()):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def test_cache_survives_unrelated_writes_and_sees_settings_changes(monkeypatch):
+    monkeypatch.setattr(settings, "VERSION_CHECK_INTERVAL", 0)
+    assert get_daily_required_hours() == 16.0
+    loads = []
+    original_load = settings._settings_cache._load
+    monkeypatch.setattr(settings._settings_cache, "_load", lambda: loads.append(1) or original_load())
+
+    _execute("INSERT INTO employees (name, role, monthly_salary) VALUES ('A', 'r', 1000)")
+    assert get_daily_required_hours() == 16.0
+    assert loads == []
+
+    # Written behind the cache's back, as another process would
+    _execute("UPDATE system_settings SET setting_value = '9' WHERE setting_key = 'daily_hours'")
+    assert get_daily_required_hours() == 9.0
+    assert loads == [1]